@@ -9,6 +9,8 @@ FEEDBACK_PORT = 1
 
 FEEDBACK_CONFIG = 2
 
+FEEDBACK_TIMING = 4
+
 STATUS_RUNNING = 0
 
 STATUS_PAUSED = 1
@@ -7,6 +7,7 @@ logging.getLogger('werkzeug').setLevel(logging.ERROR)
 from core.api.constants import *
 from core.compatibility import get_items
 from core.config import config_to_dict
+from core.files import list_data_files, load_metadata
 from core.notify import *
     
     
@@ -30,6 +31,10 @@ def _get_config():
     app.config['PIPE_REQUEST_SEND'].send(FEEDBACK_CONFIG)
     return app.config['PIPE_CONFIG_RECV'].recv()
     
+def _get_timing():
+    app.config['PIPE_REQUEST_SEND'].send(FEEDBACK_TIMING)
+    return app.config['PIPE_TIMING_RECV'].recv()
+    
 def _get_status():
     app.config['PIPE_REQUEST_SEND'].send(FEEDBACK_STATUS)
     status = app.config['PIPE_STATUS_RECV'].recv()
@@ -84,6 +89,22 @@ def get_port(port_type=None):
         abort(404)
 
 
+@app.route('/timing/')
+def get_timing():
+    return jsonify(_get_timing())
+
+
+@app.route('/profiles/')
+@app.route('/profiles/<string:profile>/')
+def get_profiles(profile=None):
+    if profile is None:
+        return jsonify({name: load_metadata(name) for name in list_data_files()})
+    metadata = load_metadata(profile)
+    if metadata['Modified'] is None:
+        abort(404)
+    return jsonify(metadata)
+
+
 @app.route('/config/', methods=['GET'])
 @app.route('/config/<string:heading>/', methods=['GET'])
 @app.route('/config/<string:heading>/<string:variable>/', methods=['GET'])
@@ -52,9 +52,11 @@ class AppList(object):
         
     def __setitem__(self, key, value):
         self.data[key] = value
+        self._index = None
 
     def __delitem__(self, key):
         del self.data[key]
+        self._index = None
 
     def __contains__(self, key):
         return key in self.data
@@ -72,7 +74,28 @@ class AppList(object):
         return bool(self.data)
 
     def pop(self, n):
+        self._index = None
         return self.data.pop(n)
+
+    @property
+    def index(self):
+        """Get the name of each executable for when the window isn't known.
+        It is only built again after the list changes, so checking the
+        running processes doesn't need to go through the whole list.
+        """
+        if self._index is None:
+            self._index = {}
+            for executable, names in get_items(self.data):
+                try:
+                    self._index[executable] = names[None]
+                
+                #Only fallback to window name if it is the only entry for that application
+                #Otherwise we don't know which entry to use, so ignore
+                except KeyError:
+                    app_names = set(names.values())
+                    if len(app_names) == 1:
+                        self._index[executable] = app_names.pop()
+        return self._index
         
     def _read(self, path=None, url=None):
         """Parse an application list and return a dictionary.
@@ -160,6 +183,7 @@ class AppList(object):
     def refresh(self):
         """Get data from the file."""
         self.data = self._read(self.path)
+        self._index = None
         
         #Build list of names
         self.names = []
@@ -207,6 +231,7 @@ class AppList(object):
                 for name in names:
                     if name not in self.data[executable]:
                         self.data[executable][name] = names[name]
+        self._index = None
         return True
 
     def get_names(self):
@@ -261,49 +286,25 @@ class RunningApplications(object):
 
     def all_loaded_apps(self):
         """Get list of every loaded program."""
-        loaded = []
-        
         #Get dict of running processes here if focus is enabled
         if WindowFocus is not None:
             self.processes = get_running_processes()
         
-        matching_applications = {self.processes[app]: app
-                                 for app in self.applist
-                                 if app in self.processes}
-        
-        for index in sorted(matching_applications.keys())[::-1]:
-            loaded_exe = matching_applications[index]
-            names = self.applist[loaded_exe]
-            try:
-                loaded.append(names[None])
-
-            #Only fallback to window name if it is the only entry for that application
-            except KeyError:
-                if len(names) == 1 or len(set(names.values())) == 1:
-                    loaded.append(names[names.keys()[0]])
-        return set(loaded)
+        app_index = self.applist.index
+        return set(app_index[app] for app in self.processes if app in app_index)
             
     def check(self):
         """Return the name and executable of a running application."""
         #Get most recently loaded application
         if self.focus is None:
             
-            matching_applications = {self.processes[app]: app
-                                     for app in self.applist
-                                     if app in self.processes}
-            
-            for index in sorted(matching_applications.keys())[::-1]:
-                loaded_exe = matching_applications[index]
-                names = self.applist[loaded_exe]
-                try:
-                    return names[None], loaded_exe
-
-                #Only fallback to window name if it is the only entry for that application
-                #Otherwise we don't know which entry to use, so ignore
-                except KeyError:
-                    if len(names) == 1 or len(set(names.values())) == 1:
-                        return names[names.keys()[0]], loaded_exe
-            return None
+            app_index = self.applist.index
+            matching_applications = [(index, app) for app, index in get_items(self.processes)
+                                     if app in app_index]
+            if not matching_applications:
+                return None
+            loaded_exe = max(matching_applications)[1]
+            return app_index[loaded_exe], loaded_exe
 
         #Get currently focused application
         else:
@@ -205,6 +205,29 @@ DEFAULTS = {
             'type': float,
             'min': 0
         },
+        'BlurAccuracy': {
+            '__info__': 'Set how accurate the gaussian blur should be. Lower accuracies blur a smaller copy of the heatmap, which is faster on large images.',
+            '__priority__': 4,
+            'value': 'high',
+            'type': str,
+            'case_sensitive': False,
+            'valid': ('high', 'medium', 'low')
+        },
+        'BlurDownscale': {
+            '__info__': 'How many times smaller the blurred copy of the heatmap is. Set to 0 to choose based on the accuracy, or 1 to blur at full size.',
+            '__priority__': 5,
+            'value': 0,
+            'type': int,
+            'min': 0
+        },
+        'ClipAccuracy': {
+            '__info__': 'Set how accurate the range clipping should be. Low accuracy is faster on large images, but clips sparse heatmaps more.',
+            '__priority__': 6,
+            'value': 'high',
+            'type': str,
+            'case_sensitive': False,
+            'valid': ('high', 'low')
+        },
         '_MouseButtonLeft': {
             'value': True,
             'type': bool
@@ -360,6 +383,42 @@ DEFAULTS = {
             'min': 0,
             'max': 1
         },
+        'ImageThreads': {
+            '__info__': 'Number of threads to use when upscaling arrays for images. Set to 0 to use one per CPU core.',
+            'value': 0,
+            'type': int,
+            'min': 0
+        },
+        'RenderCacheSize': {
+            '__info__': 'Maximum size in megabytes of the cache used to speed up rendering images again. Set to 0 to disable.',
+            'value': 512,
+            'type': int,
+            'min': 0
+        },
+        'ImageProcesses': {
+            '__info__': 'Number of profiles to render at the same time when generating images in batch mode. Set to 0 to use one per CPU core.',
+            'value': 0,
+            'type': int,
+            'min': 0
+        },
+        'ImageMemoryLimit': {
+            '__info__': 'Maximum memory in megabytes to use when generating images in batch mode. Set to 0 to use half of the available memory.',
+            'value': 0,
+            'type': int,
+            'min': 0
+        },
+        'ImageTimeout': {
+            '__info__': 'Maximum time in minutes to wait for a profile to render when generating images in batch mode. Set to 0 to wait forever.',
+            'value': 30,
+            'type': int,
+            'min': 0
+        },
+        'HeatmapLevels': {
+            '__info__': 'Group heatmap values into this many levels instead of using every unique value. This is faster on large images. Set to 0 to disable.',
+            'value': 0,
+            'type': int,
+            'min': 0
+        },
         'CompressTrackMax': {
             '__info__': 'Maximum number of of ticks before compression happens. Set to 0 to disable.',
             'value': 425000,
@@ -373,6 +432,27 @@ DEFAULTS = {
             'type': float,
             'min': 1.001
         },
+        'TrackDataType': {
+            '__info__': 'Data type to store the track maps as. It will automatically be increased if the values get too large.',
+            'value': 'uint32',
+            'type': str,
+            'case_sensitive': False,
+            'valid': ('uint16', 'uint32', 'uint64', 'int64', 'float64')
+        },
+        'SpeedDataType': {
+            '__info__': 'Data type to store the speed maps as. It will automatically be increased if the values get too large.',
+            'value': 'uint16',
+            'type': str,
+            'case_sensitive': False,
+            'valid': ('uint16', 'uint32', 'uint64', 'int64', 'float64')
+        },
+        'ClickDataType': {
+            '__info__': 'Data type to store the click maps as. It will automatically be increased if the values get too large.',
+            'value': 'uint16',
+            'type': str,
+            'case_sensitive': False,
+            'valid': ('uint16', 'uint32', 'uint64', 'int64', 'float64')
+        },
         'CheckResolution': {
             '__info__': 'How many ticks to wait between checking the resolution.',
             'value': 60,
@@ -397,6 +477,18 @@ DEFAULTS = {
             'type': int,
             'min': 0
         },
+        'BatchFrames': {
+            '__info__': 'Maximum number of ticks to group together before sending to the background process (set to 1 to disable).',
+            'value': 30,
+            'type': int,
+            'min': 1
+        },
+        'BatchTime': {
+            '__info__': 'Maximum number of milliseconds to wait before sending a group of ticks to the background process.',
+            'value': 500,
+            'type': int,
+            'min': 0
+        },
         'RepeatKeyPress': {
             '__info__': 'How many ticks to wait before recording a new key press if a key is being held down (set to 0 to disable).',
             'value': 0,
@@ -415,6 +507,24 @@ DEFAULTS = {
             'type': int,
             'min': 0
         },
+        'EventInput': {
+            '__info__': 'Record key and mouse button events as they happen instead of checking every key each tick. This is only used if supported by the operating system.',
+            'value': True,
+            'type': bool
+        },
+        'IdleTime': {
+            '__info__': 'How many seconds without any input before the tracking slows down (set to 0 to disable). This only happens if EventInput is enabled and supported.',
+            'value': 30,
+            'type': int,
+            'min': 0
+        },
+        'IdleUpdatesPerSecond': {
+            '__info__': 'How many times per second to check for input when idle. The ticks are still counted at the normal rate.',
+            'value': 4,
+            'type': int,
+            'min': 1,
+            'max': 60
+        },
         'KeyboardKeySize': {
             'value': 65.0,
             'type': float,
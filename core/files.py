@@ -9,6 +9,7 @@ import time
 import zlib
 import os
 import zipfile
+from itertools import count
 from operator import itemgetter
 from tempfile import gettempdir
 
@@ -37,8 +38,14 @@ DATA_CORRUPT_FOLDER = '.corrupted'
 
 DATA_SAVED_FOLDER = 'Saved'
 
+DATA_CACHE_FOLDER = '.cache'
+
 PICKLE_PROTOCOL = min(pickle.HIGHEST_PROTOCOL, 2)
 
+_LOAD_COUNT = count()
+
+_METADATA_CACHE = {}
+
 LOCK_FILE = '{}/mousetrack-{}.lock'.format(TEMPORARY_PATH, format_name(DATA_FOLDER, '-_'))   #Temporary folder
 #LOCK_FILE = '{}/mousetrack-{}.lock'.format(DATA_FOLDER, 1)   #Data folder (for testing)
 
@@ -70,8 +77,12 @@ def _get_paths(program_name):
             'BackupFolder': backup_folder, 'TempFolder': temp_folder, 'CorruptedFolder': corrupted_folder}
 
 
-def prepare_file(data, legacy=False):
-    """Prepare data for saving."""
+def prepare_file(data, legacy=False, cache=None):
+    """Prepare data for saving.
+    
+    Each map is compressed separately, so that if a cache dictionary is given,
+    any map that hasn't been marked as modified since the last save can reuse it.
+    """
     data['Time']['Modified'] = time.time()
     data['FileVersion'] = FILE_VERSION
     data['Version'] = VERSION
@@ -80,7 +91,9 @@ def prepare_file(data, legacy=False):
         return zlib.compress(pickle.dumps(data, PICKLE_PROTOCOL))
     
     #Separate the maps from the main dictionary
-    numpy_maps = IterateMaps(data['Resolution']).separate()
+    iterate_maps = IterateMaps(data['Resolution'])
+    numpy_maps = iterate_maps.separate()
+    map_versions = getattr(data, 'map_versions', {})
     
     #Write the maps to a zip file in memory
     io = BytesIO()
@@ -94,9 +107,25 @@ def prepare_file(data, legacy=False):
         f.write(str(data['Time']['Created']), 'metadata/created.txt')
         f.write(str(data['TimesLoaded']), 'metadata/sessions.txt')
         f.write(str(data['Ticks']['Total']), 'metadata/time.txt')
+        f.write(','.join('{}x{}'.format(*resolution) for resolution in data['Resolution']), 'metadata/resolutions.txt')
         
-        for i, m in enumerate(numpy_maps):
-            f.write(numpy.save(m), 'maps/{}.npy'.format(i))
+        for i, (path, m) in enumerate(zip(iterate_maps.paths, numpy_maps)):
+            version = map_versions.get(path, 0)
+            try:
+                cached_version, compressed_map = cache[path]
+                if cached_version != version:
+                    raise KeyError(path)
+            except (KeyError, TypeError):
+                if isinstance(m, numpy.TiledArray):
+                    compressed_map = zlib.compress(numpy.save_tiled(m))
+                else:
+                    compressed_map = zlib.compress(numpy.save(m))
+                if cache is not None:
+                    cache[path] = (version, compressed_map)
+            if isinstance(m, numpy.TiledArray):
+                f.write(compressed_map, 'maps/{}.tiles.z'.format(i), compress=False)
+            else:
+                f.write(compressed_map, 'maps/{}.npy.z'.format(i), compress=False)
     
     #Undo the modify
     IterateMaps(data['Resolution']).join(numpy_maps)
@@ -104,26 +133,102 @@ def prepare_file(data, legacy=False):
     return io.getvalue()
     
 
-def decode_file(f, legacy=False):
-    """Read compressed data."""
+def _decode_map(raw, filename):
+    """Convert the stored bytes of a map back to an array."""
+    if filename.endswith('.tiles.z'):
+        return numpy.load_tiled(zlib.decompress(raw))
+    if filename.endswith('.z'):
+        return numpy.load(zlib.decompress(raw))
+    return numpy.load(raw)
+
+
+def _read_map(f, filename):
+    """Read a single map from an open profile."""
+    return _decode_map(f.read(filename), filename)
+
+
+class _LazyMap(object):
+    """Placeholder for a map that will be decoded when needed.
+    The stored bytes are read with the rest of the profile,
+    so the map always matches the data it was loaded with.
+    """
+    def __init__(self, raw, filename):
+        self.raw = raw
+        self.filename = filename
+    
+    def load(self):
+        return _decode_map(self.raw, self.filename)
+
+
+class LazyMaps(dict):
+    """Dictionary that only decodes each map from the profile the first time it is used.
+    The top level stores map_hash, to identify the file the maps were read from.
+    """
+    map_hash = None
+    
+    def __getitem__(self, key):
+        value = super(LazyMaps, self).__getitem__(key)
+        if isinstance(value, _LazyMap):
+            value = value.load()
+            self[key] = value
+        return value
+    
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def items(self):
+        return [(k, self[k]) for k in self]
+    
+    def values(self):
+        return [self[k] for k in self]
+    
+    def iteritems(self):
+        for k in self:
+            yield k, self[k]
+    
+    def itervalues(self):
+        for k in self:
+            yield self[k]
+    
+    
+def _lazy_maps(maps):
+    """Convert each dictionary of maps to a LazyMaps object."""
+    return LazyMaps((k, _lazy_maps(v) if isinstance(v, dict) else v) for k, v in get_items(maps))
+    
+
+def decode_file(f, legacy=False, lazy=False):
+    """Read compressed data.
+    If lazy is set, the maps will not be decoded until they are used.
+    """
     #Old file format
     if legacy:
         return pickle.loads(zlib.decompress(f.read()))
     
-    #New zip format (file version 26)
+    #New zip format (file version 26), with maps compressed separately (file version 29)
+    #and sparse maps saved as tiles (file version 30)
     try:
         data = pickle.loads(f.read('data.pkl'))
+        filenames = set(f.list())
         numpy_maps = []
         i = 0
         while True:
-            try:
-                numpy_maps.append(numpy.load(f.read('maps/{}.npy'.format(i))))
-            except KeyError:
+            for filename in ('maps/{}.npy.z'.format(i), 'maps/{}.tiles.z'.format(i), 'maps/{}.npy'.format(i)):
+                if filename in filenames:
+                    break
+            else:
                 break
+            if lazy:
+                numpy_maps.append(_LazyMap(f.read(filename), filename))
+            else:
+                numpy_maps.append(_read_map(f, filename))
             i += 1
             
     #Original zip format
     except KeyError:
+        lazy = False
         data = pickle.loads(f.read('_'))
         numpy_maps = [numpy.load(f.read(i)) for i in range(int(f.read('n')))]
     
@@ -132,27 +237,109 @@ def decode_file(f, legacy=False):
         IterateMaps(data['Maps']).join(numpy_maps, _legacy=True)
     except KeyError:
         IterateMaps(data['Resolution']).join(numpy_maps, _legacy=False)
+        if lazy:
+            data['Resolution'] = _lazy_maps(data['Resolution'])
+            data['Resolution'].map_hash = _map_hash(f)
         
     return data
     
 
-def load_data(profile_name=None, _reset_sessions=True, _update_metadata=True, _create_new=True):
+def _map_hash(f):
+    """Build a hash from the checksums of the maps in the zip directory.
+    Returns None if there are no maps.
+    """
+    if f.zip is None:
+        return None
+    checksums = sorted((info.filename.replace('\\', '/'), info.CRC) for info in f.zip.infolist())
+    checksums = [(filename, crc) for filename, crc in checksums if filename.startswith('maps/')]
+    if not checksums:
+        return None
+    return '{:08x}'.format(zlib.crc32(repr(checksums).encode('utf-8')) & 0xffffffff)
+
+
+def _read_resolutions(text):
+    """Convert the resolutions metadata back to a list."""
+    return [tuple(int(i) for i in resolution.split('x')) for resolution in text.split(',') if resolution]
+
+
+_METADATA_FILES = (('Version', 'metadata/version.txt', unicode),
+                   ('FileVersion', 'metadata/file.txt', int),
+                   ('Modified', 'metadata/modified.txt', float),
+                   ('Created', 'metadata/created.txt', float),
+                   ('Sessions', 'metadata/sessions.txt', int),
+                   ('Ticks', 'metadata/time.txt', int),
+                   ('Resolutions', 'metadata/resolutions.txt', _read_resolutions))
+
+
+def load_metadata(profile_name=None):
+    """Read the metadata of a profile without loading any data.
+    
+    Only the zip directory and the metadata files are read, and the result
+    is cached until the profile is modified.
+    Anything that doesn't exist, such as in older profiles, will be None.
+    
+    MapHash is built from the checksums stored in the zip directory,
+    so it changes whenever any map is changed.
+    """
+    metadata = {key: None for key, filename, convert in _METADATA_FILES}
+    metadata['MapHash'] = None
+    
+    path = _get_paths(profile_name)['Main']
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        return metadata
+    file_id = (file_stat.st_mtime, file_stat.st_size)
+    
+    try:
+        cached_id, cached_metadata = _METADATA_CACHE[path]
+        if cached_id == file_id:
+            return dict(cached_metadata)
+    except KeyError:
+        pass
+    
+    try:
+        with CustomOpen(path, 'rb') as f:
+            #Some files were written with a backslash
+            filenames = {filename.replace('\\', '/'): filename for filename in f.list()}
+            for key, filename, convert in _METADATA_FILES:
+                if filename in filenames:
+                    try:
+                        metadata[key] = convert(f.read(filenames[filename]).decode('utf-8'))
+                    except ValueError:
+                        pass
+            
+            metadata['MapHash'] = _map_hash(f)
+    except IOError:
+        return metadata
+        
+    _METADATA_CACHE[path] = (file_id, metadata)
+    return dict(metadata)
+    
+
+def load_data(profile_name=None, _reset_sessions=True, _update_metadata=True, _create_new=True, _lazy=False, _metadata_only=False):
     """Read a profile (or create new one) and run it through the update.
     Use LoadData class instead of this.
+    
+    Set _lazy to only decode the maps when they are used, for when the profile is not being edited.
+    Set _metadata_only to return the result of load_metadata instead.
     """
+    if _metadata_only:
+        return load_metadata(profile_name)
+    
     paths = _get_paths(profile_name)
     new_file = False
     
     #Load the main file
     try:
         with CustomOpen(paths['Main'], 'rb') as f:
-            loaded_data = decode_file(f, legacy=f.zip is None)
+            loaded_data = decode_file(f, legacy=f.zip is None, lazy=_lazy)
             
     #Load backup if file is corrupted
     except (zlib.error, ValueError):
         try:
             with CustomOpen(paths['Backup'], 'rb') as f:
-                loaded_data = decode_file(f, legacy=f.zip is None)
+                loaded_data = decode_file(f, legacy=f.zip is None, lazy=_lazy)
                 
         except (IOError, zlib.error, ValueError):
             new_file = True
@@ -178,16 +365,29 @@ def load_data(profile_name=None, _reset_sessions=True, _update_metadata=True, _c
     
 class LoadData(dict):
     """Wrapper for the load_data function to allow for custom functions."""
-    def __init__(self, profile_name=None, empty=False, _reset_sessions=True, _update_metadata=True):
+    def __init__(self, profile_name=None, empty=False, _reset_sessions=True, _update_metadata=True, _lazy=False):
         if empty:
             data = upgrade_version()
         else:
-            data = load_data(profile_name=profile_name, _reset_sessions=_reset_sessions, _update_metadata=_update_metadata, _create_new=True)
+            data = load_data(profile_name=profile_name, _reset_sessions=_reset_sessions, _update_metadata=_update_metadata, _create_new=True, _lazy=_lazy)
                          
         super(LoadData, self).__init__(data)
         
         self.version = self['Version']
         self.name = profile_name
+        
+        #Used to tell which maps need compressing again when saving
+        self.map_token = next(_LOAD_COUNT)
+        self.map_versions = {}
+        
+        #Identifies the saved maps if loaded lazily, so images can be cached
+        self.map_hash = getattr(self.get('Resolution'), 'map_hash', None)
+    
+    def modified(self, *path):
+        """Mark a map as changed since it was loaded.
+        The path is the same as the keys used under data['Resolution'].
+        """
+        self.map_versions[path] = self.map_versions.get(path, 0) + 1
     
     def _get_track_map(self, track_type, session=False):
         """Return dictionary of tracks along with top resolution and range of values.
@@ -202,7 +402,7 @@ class LoadData(dict):
         max_value = -float('inf')
         result = {}
         for resolution, maps in get_items(self['Resolution']):
-            array = numpy.max(maps[track_type] - start_time, 0)
+            array = numpy.max(numpy.set_type(maps[track_type], 'int64') - start_time, 0)
             num_records = numpy.count(array)
             if num_records:
                 result[resolution] = array
@@ -371,16 +571,26 @@ class CustomOpen(object):
             return self._file_object.read()
         return self.zip.read(str(filename))
 
-    def write(self, data, filename=None):
-        """Write to the file."""
+    def write(self, data, filename=None, compress=True):
+        """Write to the file.
+        Set compress to False to store data that is already compressed.
+        """
         if self.zip is None:
             if isinstance(data, (str, unicode)):
                 return self._file_object.write(data.encode('utf-8'))
             return self._file_object.write(data)
         if filename is None:
             raise TypeError('filename required when writing to zip')
+        if not compress:
+            return self.zip.writestr(str(filename), data, compress_type=zipfile.ZIP_STORED)
         return self.zip.writestr(str(filename), data)
  
+    def list(self):
+        """List the files in the zip."""
+        if self.zip is None:
+            return []
+        return self.zip.namelist()
+ 
     def seek(self, amount):
         """Seek to a certain point of the file."""
         if amount is None or self._file_object is None:
@@ -8,6 +8,8 @@ from __future__ import absolute_import, division
 from PIL import Image
 import zlib
 
+import core.numpy as numpy
+
 from core.base import format_file_path
 from core.constants import UPDATES_PER_SECOND, DEFAULT_NAME
 from core.compatibility import get_items, Message, pickle
@@ -18,8 +20,12 @@ from core.maths import round_int
 from core.os import create_folder, remove_file, join_path
 from core.versions import VERSION
 from core.image.keyboard import DrawKeyboard
-from core.image.calculate import arrays_to_heatmap, arrays_to_colour, gaussian_size, calculate_resolution, upscale_arrays_to_resolution
+from core.image.calculate import arrays_to_heatmap, arrays_to_colour, gaussian_size, calculate_resolution, calculate_render_resolution, upscale_arrays_to_resolution
 from core.image.colours import ColourRange, calculate_colour_map
+from core.image.cache import RenderCache, cache_key, profile_version, render_settings
+
+
+RENDER_CACHE = RenderCache()
 
 
 class ImageName(object):
@@ -237,7 +243,7 @@ class RenderImage(object):
         else:
             self.profile = profile
         
-            self.data = LoadData(profile, _update_metadata=False)
+            self.data = LoadData(profile, _update_metadata=False, _lazy=True)
             if self.data is None:
                 raise ValueError('profile doesn\'t exist')
             
@@ -286,23 +292,59 @@ class RenderImage(object):
             colour_map = calculate_colour_map(CONFIG[config_heading]['ColourProfile'].default)
         return ColourRange(min_value, max_value, colour_map)
     
-    def tracks(self, last_session=False, file_name=None):
-        """Render track image."""
-    
-        track_data = self.data.get_tracks()
-        if track_data is None:
-            Message('No tracking data found.')
+    def _cache_key(self, *args):
+        """Create a key for the render cache, or None if the data can't be cached."""
+        version = profile_version(self.data)
+        if version is None:
             return None
+        return cache_key(version, *args)
+    
+    def _track_image(self, map_type, config_heading):
+        """Render the image for tracks or speed.
+        The merged array and final image are both cached.
+        """
+        data_key = self._cache_key(map_type, render_settings(['GenerateImages']))
+        cached = RENDER_CACHE.get(data_key)
+        
+        if cached is None:
+            if map_type == 'Speed':
+                track_data = self.data.get_speed()
+            else:
+                track_data = self.data.get_tracks()
+            if track_data is None:
+                Message('No tracking data found.')
+                return None
+                
+            top_resolution, (min_value, max_value), tracks = track_data
+            resolutions = list(tracks.keys())
             
-        top_resolution, (min_value, max_value), tracks = track_data
+            output_resolution, upscale_resolution = calculate_resolution(resolutions, top_resolution)
+            render_resolution = calculate_render_resolution(output_resolution, upscale_resolution)
+            upscaled_arrays = upscale_arrays_to_resolution(tracks, render_resolution)
+            merged_array = numpy.merge(upscaled_arrays, 'max')
+            RENDER_CACHE.set(data_key, (resolutions, top_resolution, (min_value, max_value), merged_array))
         
-        output_resolution, upscale_resolution = calculate_resolution(tracks.keys(), top_resolution)
-        upscaled_arrays = upscale_arrays_to_resolution(tracks, upscale_resolution)
+        else:
+            resolutions, top_resolution, (min_value, max_value), merged_array = cached
+            output_resolution, upscale_resolution = calculate_resolution(resolutions, top_resolution)
 
-        colour_range = self._get_colour_range(min_value, max_value, 'GenerateTracks')
-        
-        image_output = arrays_to_colour(colour_range, upscaled_arrays)
-        image_output = image_output.resize(output_resolution, Image.ANTIALIAS)
+        colour_range = self._get_colour_range(min_value, max_value, config_heading)
+        
+        image_key = None if data_key is None else cache_key(data_key, colour_range.colours, output_resolution)
+        image_output = RENDER_CACHE.get(image_key)
+        if image_output is None:
+            image_output = arrays_to_colour(colour_range, [merged_array])
+            if image_output.size != tuple(output_resolution):
+                image_output = image_output.resize(output_resolution, Image.ANTIALIAS)
+            RENDER_CACHE.set(image_key, image_output)
+        return image_output
+    
+    def tracks(self, last_session=False, file_name=None):
+        """Render track image."""
+    
+        image_output = self._track_image('Tracks', 'GenerateTracks')
+        if image_output is None:
+            return None
 
         if file_name is None:
             file_name = self.name.generate('Tracks', reload=True)
@@ -316,20 +358,9 @@ class RenderImage(object):
     def speed(self, last_session=False, file_name=None):
         """Render speed track image."""
     
-        track_data = self.data.get_speed()
-        if track_data is None:
-            Message('No tracking data found.')
+        image_output = self._track_image('Speed', 'GenerateSpeed')
+        if image_output is None:
             return None
-            
-        top_resolution, (min_value, max_value), tracks = track_data
-        
-        output_resolution, upscale_resolution = calculate_resolution(tracks.keys(), top_resolution)
-        upscaled_arrays = upscale_arrays_to_resolution(tracks, upscale_resolution)
-
-        colour_range = self._get_colour_range(min_value, max_value, 'GenerateSpeed')
-        
-        image_output = arrays_to_colour(colour_range, upscaled_arrays)
-        image_output = image_output.resize(output_resolution, Image.ANTIALIAS)
 
         if file_name is None:
             file_name = self.name.generate('Speed', reload=True)
@@ -346,9 +377,21 @@ class RenderImage(object):
 
     def clicks(self, last_session=False, file_name=None, _double_click=False):
         """Render heatmap of clicks."""
+        
+        settings = render_settings(['GenerateImages', 'GenerateHeatmap'], ignore=['ColourProfile'])
+        settings['Advanced'] = {k: CONFIG['Advanced'][k] for k in ('HeatmapRangeClipping', 'HeatmapLevels')}
+        data_key = self._cache_key('Clicks', _double_click, last_session, settings)
+        cached = RENDER_CACHE.get(data_key)
+        
+        if cached is not None:
+            resolutions, top_resolution, (min_value, max_value), heatmap = cached
+            output_resolution, upscale_resolution = calculate_resolution(resolutions, top_resolution)
+            return self._save_heatmap(data_key, (min_value, max_value), heatmap, output_resolution, file_name)
 
         top_resolution, (min_value, max_value), clicks = self.data.get_clicks(session=last_session, double_click=_double_click)
-        output_resolution, upscale_resolution = calculate_resolution(clicks.keys(), top_resolution)
+        resolutions = list(clicks.keys())
+        output_resolution, upscale_resolution = calculate_resolution(resolutions, top_resolution)
+        render_resolution = calculate_render_resolution(output_resolution, upscale_resolution)
 
         lmb = CONFIG['GenerateHeatmap']['_MouseButtonLeft']
         mmb = CONFIG['GenerateHeatmap']['_MouseButtonMiddle']
@@ -361,16 +404,29 @@ class RenderImage(object):
                 skip.append(1)
             if not rmb:
                 skip.append(2)
-        upscaled_arrays = upscale_arrays_to_resolution(clicks, upscale_resolution, skip=skip)
+        upscaled_arrays = upscale_arrays_to_resolution(clicks, render_resolution, skip=skip, merge_type='add')
 
         (min_value, max_value), heatmap = arrays_to_heatmap(upscaled_arrays,
-                               gaussian_size=gaussian_size(upscale_resolution[0], upscale_resolution[1]),
-                               clip=1-CONFIG['Advanced']['HeatmapRangeClipping'])
-
-        colour_range = self._get_colour_range(min_value, max_value, 'GenerateHeatmap')
-        
-        image_output = Image.fromarray(colour_range.convert_to_rgb(heatmap))
-        image_output = image_output.resize(output_resolution, Image.ANTIALIAS)
+                               gaussian_size=gaussian_size(render_resolution[0], render_resolution[1]),
+                               clip=1-CONFIG['Advanced']['HeatmapRangeClipping'],
+                               levels=CONFIG['Advanced']['HeatmapLevels'],
+                               cache_key=(self.profile, _double_click, last_session, tuple(skip),
+                                          self.data['Time']['Modified'], self.data['Ticks']['Total']))
+        RENDER_CACHE.set(data_key, (resolutions, top_resolution, (min_value, max_value), heatmap))
+        
+        return self._save_heatmap(data_key, (min_value, max_value), heatmap, output_resolution, file_name)
+    
+    def _save_heatmap(self, data_key, value_range, heatmap, output_resolution, file_name=None):
+        """Colour and save a heatmap, using the cached image if possible."""
+        colour_range = self._get_colour_range(value_range[0], value_range[1], 'GenerateHeatmap')
+        
+        image_key = None if data_key is None else cache_key(data_key, colour_range.colours, output_resolution)
+        image_output = RENDER_CACHE.get(image_key)
+        if image_output is None:
+            image_output = Image.fromarray(colour_range.convert_to_rgb(heatmap))
+            if image_output.size != tuple(output_resolution):
+                image_output = image_output.resize(output_resolution, Image.ANTIALIAS)
+            RENDER_CACHE.set(image_key, image_output)
 
         if file_name is None:
             file_name = self.name.generate('Clicks', reload=True)
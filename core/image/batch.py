@@ -0,0 +1,222 @@
+"""
+This is part of the Mouse Tracks Python application.
+Source: https://github.com/Peter92/MouseTracks
+"""
+#Render images for many profiles at once without any user input
+
+from __future__ import absolute_import, division
+
+import time
+from multiprocessing import Pool, Queue, cpu_count
+
+import psutil
+
+from core.compatibility import Message, queue, PYTHON_VERSION
+from core.config import CONFIG
+from core.files import list_data_files, load_metadata
+
+
+RENDER_TYPES = ('tracks', 'speed', 'clicks', 'keyboard', 'csv')
+
+#Rough number of bytes used for each pixel while rendering an image
+_RENDER_BYTES_PER_PIXEL = 48
+
+#Rough number of bytes used for each pixel of the loaded maps
+_MAP_BYTES_PER_PIXEL = 8
+
+_MIN_MEMORY = 64 * 1024 * 1024
+
+#How often to check if any profile has taken too long
+_TIMEOUT_CHECK = 5
+
+
+def estimate_memory(profile):
+    """Estimate how many bytes rendering a profile will need.
+    The saved resolutions are used, so nothing needs loading.
+    """
+    resolutions = load_metadata(profile)['Resolutions']
+    if not resolutions:
+        return _MIN_MEMORY
+
+    map_pixels = 0
+    for x, y in resolutions:
+        map_pixels += x * y
+    render_pixels = max(x for x, y in resolutions) * max(y for x, y in resolutions)
+    if CONFIG['GenerateImages']['HighPrecision']:
+        render_pixels *= 4
+
+    return max(_MIN_MEMORY, map_pixels * _MAP_BYTES_PER_PIXEL + render_pixels * _RENDER_BYTES_PER_PIXEL)
+
+
+#Set in each worker process to send the time a profile was started
+_STARTED = None
+
+_GENERATION = None
+
+
+def _init_worker(started, generation):
+    global _STARTED, _GENERATION
+    _STARTED = started
+    _GENERATION = generation
+
+
+def render_profile(job):
+    """Render a list of image types for a single profile.
+    The profile is loaded once, and each map is only read the first time it is needed.
+
+    Returns a list of results, as errors can't always be sent back from a process.
+    """
+    from core.image import RenderImage
+
+    profile, image_types, last_session = job
+    results = []
+
+    start = time.time()
+    if _STARTED is not None:
+        _STARTED.put((_GENERATION, profile, start))
+    try:
+        if load_metadata(profile)['Modified'] is None:
+            raise ValueError('profile doesn\'t exist')
+        r = RenderImage(profile)
+    except Exception as e:
+        return [{'Profile': profile, 'Type': 'load', 'Time': time.time() - start,
+                 'Error': '{}: {}'.format(type(e).__name__, e)}]
+    results.append({'Profile': profile, 'Type': 'load', 'Time': time.time() - start, 'Error': None})
+
+    for image_type in image_types:
+        start = time.time()
+        error = None
+        try:
+            if image_type == 'csv':
+                r.csv()
+            else:
+                getattr(r, image_type)(last_session)
+        except Exception as e:
+            error = '{}: {}'.format(type(e).__name__, e)
+        results.append({'Profile': profile, 'Type': image_type, 'Time': time.time() - start, 'Error': error})
+    return results
+
+
+def _failed_job(profile, start, error):
+    """Create the results for a profile that didn't finish."""
+    return [{'Profile': profile, 'Type': 'load', 'Time': time.time() - start, 'Error': error}]
+
+
+def render_batch(profiles=None, image_types=RENDER_TYPES, last_session=False, processes=None, memory_limit=None):
+    """Render images for many profiles at once using a process pool.
+
+    All profiles will be rendered if none are given.
+    The memory limit is in megabytes, and new profiles will only be started
+    if their estimated memory fits in what is left.
+    At least one profile will always be running.
+
+    Returns the results of each job, including how long it took.
+    """
+    if profiles is None:
+        profiles = list_data_files()
+    image_types = [image_type.lower() for image_type in image_types]
+    for image_type in image_types:
+        if image_type not in RENDER_TYPES:
+            raise ValueError('unknown image type: {}'.format(image_type))
+
+    if processes is None:
+        processes = CONFIG['Advanced']['ImageProcesses'] or cpu_count()
+    if memory_limit is None:
+        memory_limit = CONFIG['Advanced']['ImageMemoryLimit']
+    if memory_limit:
+        memory_limit *= 1024 * 1024
+    else:
+        memory_limit = psutil.virtual_memory().available // 2
+
+    #Start with the largest profiles so the smaller ones can fill any gaps
+    pending = sorted(((estimate_memory(profile), profile) for profile in set(profiles)), reverse=True)
+    if not pending:
+        return []
+    Message('Rendering {} profile(s) with up to {} processes...'.format(len(pending), processes))
+
+    if CONFIG['Advanced']['ImageTimeout']:
+        timeout = CONFIG['Advanced']['ImageTimeout'] * 60
+    else:
+        timeout = None
+
+    finished = queue.Queue()
+    started_queue = Queue()
+    pool_size = min(processes, len(pending))
+    pool = None
+    generation = 0
+    running = {}
+    started = {}
+    results = []
+    start = time.time()
+    try:
+        while pending or running:
+            
+            #Create a new pool, such as after one was stopped for taking too long
+            if pool is None:
+                generation += 1
+                pool = Pool(pool_size, initializer=_init_worker, initargs=(started_queue, generation), maxtasksperchild=1)
+
+            #Start as many profiles as the memory allows
+            memory_used = sum(running.values())
+            i = 0
+            while i < len(pending) and len(running) < processes:
+                memory, profile = pending[i]
+                if running and memory_used + memory > memory_limit:
+                    i += 1
+                    continue
+                del pending[i]
+                running[profile] = memory
+                started[profile] = time.time()
+                memory_used += memory
+                
+                #Results are tagged with the pool they came from, so anything from an old pool is ignored
+                #Errors from the pool itself, such as a process ending, are only sent back on Python 3
+                kwargs = {'callback': lambda job_results, generation=generation: finished.put((generation, job_results))}
+                if PYTHON_VERSION >= 3:
+                    kwargs['error_callback'] = lambda e, profile=profile, generation=generation: finished.put(
+                        (generation, _failed_job(profile, started.get(profile, time.time()), '{}: {}'.format(type(e).__name__, e))))
+                pool.apply_async(render_profile, ((profile, image_types, last_session),), **kwargs)
+
+            #Wait for a profile to finish
+            try:
+                job_generation, job_results = finished.get(timeout=_TIMEOUT_CHECK)
+            except queue.Empty:
+                job_generation, job_results = generation, []
+            if job_generation != generation:
+                continue
+            
+            #Use the time each profile was actually started by a process, if it has been sent
+            while not started_queue.empty():
+                start_generation, profile, profile_start = started_queue.get()
+                if start_generation == generation and profile in running:
+                    started[profile] = profile_start
+            
+            #Give up on any profile taking too long, and restart the others in a new pool
+            if not job_results and timeout is not None:
+                for profile in list(running):
+                    if time.time() - started[profile] > timeout:
+                        job_results += _failed_job(profile, started[profile], 'timed out')
+                        del running[profile]
+                if job_results:
+                    pool.terminate()
+                    pool.join()
+                    pool = None
+                    pending = sorted(pending + [(memory, profile) for profile, memory in running.items()], reverse=True)
+                    running = {}
+                    started = {}
+            
+            for result in job_results:
+                running.pop(result['Profile'], None)
+                started.pop(result['Profile'], None)
+                if result['Error'] is None:
+                    Message('{} ({}): {:.2f}s'.format(result['Profile'], result['Type'], result['Time']))
+                else:
+                    Message('{} ({}): failed after {:.2f}s - {}'.format(result['Profile'], result['Type'], result['Time'], result['Error']))
+            results += job_results
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    Message('Finished rendering in {:.2f}s.'.format(time.time() - start))
+    return results
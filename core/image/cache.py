@@ -0,0 +1,139 @@
+"""
+This is part of the Mouse Tracks Python application.
+Source: https://github.com/Peter92/MouseTracks
+"""
+#Store the stages of rendering an image so they don't need calculating again
+
+from __future__ import absolute_import
+
+import hashlib
+import os
+import time
+
+from core.compatibility import get_items, pickle
+from core.config import CONFIG, config_to_dict
+from core.files import DATA_FOLDER, DATA_CACHE_FOLDER
+from core.os import create_folder, hide_file, remove_file, list_directory, get_modified_time, set_modified_time
+
+
+CACHE_FOLDER = '{}/{}'.format(DATA_FOLDER, DATA_CACHE_FOLDER)
+
+CACHE_EXTENSION = '.cache'
+
+PICKLE_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+#Settings that only change the file, and not the image
+IGNORE_SETTINGS = ('FileName', 'FileType', 'OpenOnFinish')
+
+
+def _canonical(value):
+    """Convert a value to text that is always the same for the same input."""
+    if isinstance(value, dict):
+        items = sorted((_canonical(k), _canonical(v)) for k, v in get_items(value))
+        return '{' + ','.join('{}:{}'.format(k, v) for k, v in items) + '}'
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join(_canonical(v) for v in value) + ']'
+    return repr(value)
+
+
+def cache_key(*args):
+    """Create a hash from any combination of basic values."""
+    return hashlib.sha1(_canonical(args).encode('utf-8')).hexdigest()
+
+
+def render_settings(headings, ignore=()):
+    """Get the settings under each heading that affect an image.
+    Anything calculated while rendering is ignored.
+    """
+    config = config_to_dict(CONFIG)
+    settings = {}
+    for heading in headings:
+        settings[heading] = {k: v for k, v in get_items(config[heading])
+                             if k not in IGNORE_SETTINGS and k not in ignore
+                             and not k.startswith(('_Output', '_Upscale'))}
+    return settings
+
+
+def profile_version(data):
+    """Get a value that will change whenever the maps of a profile change.
+    This is read from the same file as the maps, so it always matches them.
+    Returns None if the data does not match the saved profile.
+    """
+    map_hash = getattr(data, 'map_hash', None)
+    if data.name is None or map_hash is None or getattr(data, 'map_versions', None):
+        return None
+    return (data.name, data['Time']['Modified'], map_hash)
+
+
+class RenderCache(object):
+    """Cache objects on disk, removing the least recently used ones when full.
+    Set max_size to the number of megabytes to keep, or 0 to disable.
+    If not set, it will be read from the config.
+    """
+    def __init__(self, folder=CACHE_FOLDER, max_size=None):
+        self.folder = folder
+        self._max_size = max_size
+
+    @property
+    def max_size(self):
+        if self._max_size is None:
+            return CONFIG['Advanced']['RenderCacheSize'] * 1024 * 1024
+        return self._max_size * 1024 * 1024
+
+    def _path(self, key):
+        return '{}/{}{}'.format(self.folder, key, CACHE_EXTENSION)
+
+    def get(self, key):
+        """Get an object from the cache, or None if it doesn't exist."""
+        if key is None or not self.max_size:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (IOError, OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+
+        #Mark as recently used
+        set_modified_time(path, time.time())
+        return value
+
+    def set(self, key, value):
+        """Store an object in the cache."""
+        if key is None or not self.max_size:
+            return False
+        if create_folder(self.folder, is_file=False):
+            hide_file(self.folder)
+
+        path = self._path(key)
+        try:
+            with open(path, 'wb') as f:
+                pickle.dump(value, f, PICKLE_PROTOCOL)
+        except (IOError, OSError):
+            remove_file(path)
+            return False
+        self.trim()
+        return True
+
+    def trim(self):
+        """Remove the least recently used files until under the size limit."""
+        files = list_directory(self.folder, force_extension=CACHE_EXTENSION)
+        if not files:
+            return
+
+        info = []
+        total_size = 0
+        for file_name in files:
+            path = '{}/{}'.format(self.folder, file_name)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            total_size += size
+            info.append((get_modified_time(path) or 0, size, path))
+
+        for modified, size, path in sorted(info):
+            if total_size <= self.max_size:
+                break
+            if remove_file(path):
+                total_size -= size
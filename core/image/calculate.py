@@ -5,7 +5,9 @@ Source: https://github.com/Peter92/MouseTracks
 
 from __future__ import absolute_import, division
 
+from collections import OrderedDict
 from multiprocessing import Process, Queue, cpu_count
+from multiprocessing.pool import ThreadPool
 from PIL import Image
 
 import core.numpy as numpy
@@ -15,6 +17,12 @@ from core.config import CONFIG
 from core.maths import round_int
 
 
+#Cached clip values, with the least recently used removed when full
+_CLIP_CACHE = OrderedDict()
+
+_CLIP_CACHE_SIZE = 32
+
+
 def gaussian_size(width, height):
     """Calculate correct size of gaussian blur.
     Currently only height is taken into account, but this could change, so takes both values.
@@ -52,12 +60,26 @@ def calculate_resolution(resolutions, output_resolution=None):
     return output_resolution, max_resolution
 
 
-def upscale_arrays_to_resolution(arrays, target_resolution, skip=[]):
+def calculate_render_resolution(output_resolution, upscale_resolution):
+    """Choose the resolution to render at before the final resize.
+    There is no need to render anything larger than the output,
+    unless high precision is enabled.
+    """
+    if CONFIG['GenerateImages']['HighPrecision']:
+        return upscale_resolution
+    if output_resolution[0] <= upscale_resolution[0] and output_resolution[1] <= upscale_resolution[1]:
+        return output_resolution
+    return upscale_resolution
+
+
+def upscale_arrays_to_resolution(arrays, target_resolution, skip=[], merge_type='max'):
     """Upscale a dict of arrays to a certain resolution.
     The dictionary key must be a resolution,
     and the values can either be an array or list of arrays.
     
     Use skip to ignore array indexes in the list.
+    If an array is larger than the resolution, the values will be merged
+    with merge_type, which should be 'add' for counts and 'max' otherwise.
     """
     if isinstance(skip, int):
         skip = [skip]
@@ -72,10 +94,10 @@ def upscale_arrays_to_resolution(arrays, target_resolution, skip=[]):
         elif 0 not in skip:
             num_arrays += 1
 
-    #Upscale each array
+    #Find each array to upscale
     Message('Upscaling arrays to {}x{}...'.format(target_resolution[0], target_resolution[1]))
     processed = 0
-    output = []
+    jobs = []
     for resolution, array_list in get_items(arrays):
 
         if not isinstance(array_list, (list, tuple)):
@@ -85,18 +107,70 @@ def upscale_arrays_to_resolution(arrays, target_resolution, skip=[]):
             if i in skip:
                 continue
             processed += 1
-            Message('Processing array for {}x{} ({}/{})'.format(resolution[0], resolution[1], processed, num_arrays))
             zoom_factor = (target_resolution[1] / resolution[1],
                            target_resolution[0] / resolution[0])
-            upscaled = upscale(array, zoom_factor)
-            output.append(upscaled)
-    return output
+            jobs.append((array, zoom_factor, target_resolution, merge_type, resolution, processed, num_arrays))
+    
+    #Upscale the arrays, the zoom releases the GIL so threads can run at the same time
+    threads = min(len(jobs), CONFIG['Advanced']['ImageThreads'] or cpu_count())
+    if threads <= 1:
+        return [_upscale_job(job) for job in jobs]
+    pool = ThreadPool(threads)
+    try:
+        return pool.map(_upscale_job, jobs)
+    finally:
+        pool.close()
+        pool.join()
+
 
+def _upscale_job(job):
+    """Upscale a single array for upscale_arrays_to_resolution."""
+    array, zoom_factor, target_resolution, merge_type, resolution, processed, num_arrays = job
+    Message('Processing array for {}x{} ({}/{})'.format(resolution[0], resolution[1], processed, num_arrays))
+    if zoom_factor[0] < 1 or zoom_factor[1] < 1:
+        return numpy.resample(numpy.dense(array), (target_resolution[1], target_resolution[0]), merge_type)
+    return upscale(numpy.dense(array), zoom_factor)
 
-def arrays_to_heatmap(numpy_arrays, gaussian_size, clip):
+
+def clip_value(array, clip, accuracy='high', cache_key=None):
+    """Find the value a fraction of the way through the values of an array.
+    
+    A high accuracy uses the unique values, which needs a full sort.
+    Low accuracy uses every value above the background instead,
+    which runs in linear time but gives a lower value on sparse arrays.
+    If cache_key is given, the result will be reused for the same key.
+    """
+    if cache_key is not None:
+        cache_key = (cache_key, clip, accuracy, array.shape)
+        try:
+            result = _CLIP_CACHE.pop(cache_key)
+        except KeyError:
+            pass
+        else:
+            _CLIP_CACHE[cache_key] = result
+            return result
+    
+    values = array.ravel()
+    if accuracy == 'low':
+        background = numpy.min(values)
+        values = values[values > background]
+        result = numpy.quantile(values, clip) if values.size else background
+    else:
+        result = numpy.quantile(values, clip, unique=True)
+    
+    if cache_key is not None:
+        if len(_CLIP_CACHE) >= _CLIP_CACHE_SIZE:
+            _CLIP_CACHE.popitem(last=False)
+        _CLIP_CACHE[cache_key] = result
+    return result
+
+
+def arrays_to_heatmap(numpy_arrays, gaussian_size, clip, levels=None, cache_key=None):
     """Convert list of arrays into a heatmap.
     The stages and values are chosen with trial and error, 
     so this function is still open to improvement.
+    
+    The cache key should identify the data used, such as the profile and map.
     """
     
     #Add all arrays together
@@ -105,12 +179,14 @@ def arrays_to_heatmap(numpy_arrays, gaussian_size, clip):
     
     #Set to constant values
     Message('Flattening values...')
-    flattened = numpy.remap_to_range(merged_arrays)
+    flattened = numpy.remap_to_range(merged_arrays, levels=levels or None)
     
     #Blur the array
     if gaussian_size:
         Message('Applying gaussian blur...')
-        heatmap = blur(flattened, gaussian_size)
+        heatmap = blur(flattened, gaussian_size,
+                       accuracy=CONFIG['GenerateHeatmap']['BlurAccuracy'].lower(),
+                       downscale=CONFIG['GenerateHeatmap']['BlurDownscale'])
     else:
         heatmap = flattened
     
@@ -118,8 +194,11 @@ def arrays_to_heatmap(numpy_arrays, gaussian_size, clip):
     min_value = numpy.min(heatmap)
     
     #Lower the maximum value a little
-    all_values = numpy.sort(heatmap.ravel(), unique=True)
-    max_value = all_values[round_int(all_values.size * clip)]
+    if cache_key is not None:
+        cache_key = (cache_key, gaussian_size, levels,
+                     CONFIG['GenerateHeatmap']['BlurAccuracy'].lower(),
+                     CONFIG['GenerateHeatmap']['BlurDownscale'])
+    max_value = clip_value(heatmap, clip, accuracy=CONFIG['GenerateHeatmap']['ClipAccuracy'].lower(), cache_key=cache_key)
     
     return ((min_value, max_value), heatmap)
 
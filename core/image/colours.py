@@ -48,7 +48,8 @@ SEPERATORS = ['to', 'then']
 
 class ColourRange(object):
     """Make a transition between colours.
-    All possible colours within the range are cached for quick access.
+    All possible colours within the range are cached for quick access,
+    both as a list and as a lookup table for converting whole arrays.
     """
     
     def __init__(self, min_amount, max_amount, colours, offset=0, colour_steps=256, loop=False, cache=None, background=None):
@@ -77,6 +78,7 @@ class ColourRange(object):
                 self.cache.append(self.calculate_colour(self.min + i * self._step_size))
         else:
             self.cache = cache
+        self._lookup = numpy.array(self.cache, dtype='uint8')
             
     def __getitem__(self, n):
         """Read an item from the cache."""
@@ -129,15 +131,17 @@ class ColourRange(object):
             Message(message.format(array.size))
         
         new = numpy.round(numpy.divide(array - self.min, self._step_size), 0, 'int64')
-    
-        start_colour = self.cache[0]
-        end_colour = self.cache[-1]
-        colour_array = [[self.cache[item] if 0 <= item <= self.steps 
-                         else start_colour if item < 0 
-                         else end_colour for item in sublst] 
-                        for sublst in new.tolist()]
+        
+        #Match the behaviour of __getitem__
+        if self.loop:
+            looped = new % self.steps
+            looped[new == self.steps] = self.steps
+            new = looped
+        colour_array = numpy.lookup(self._lookup, new)
+        if self.background is not None:
+            colour_array[array == 0] = self.background
                         
-        return numpy.array(colour_array, dtype='uint8')
+        return colour_array
     
     def _preview_gradient(self, width, height):
         """Draw a gradient to test the colours."""
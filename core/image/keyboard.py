@@ -7,6 +7,8 @@ from __future__ import absolute_import, division
 
 from PIL import Image, ImageFont, ImageDraw
 
+import core.numpy as numpy
+from core.image.cache import RenderCache, cache_key
 from core.image.colours import COLOUR_FILE, ColourRange, calculate_colour_map, get_luminance, parse_colour_file
 from core.compatibility import get_items, range, Message
 from core.config import CONFIG
@@ -52,6 +54,14 @@ _CIRCLE = {
     'BottomLeft': calculate_circle(KEY_CORNER_RADIUS, 'BottomLeft'),
 }
 
+#Masks of each key shape, as every key of the same size looks the same
+_MASK_CACHE = {}
+
+#Position and shape of every key for each layout
+_GEOMETRY_CACHE = {}
+
+_GEOMETRY_DISK_CACHE = RenderCache()
+
 
 class KeyboardButton(object):
     def __init__(self, x, y, x_len, y_len=None):
@@ -133,6 +143,28 @@ class KeyboardButton(object):
         coordinates += [self._circle_offset(x, y, 'BottomRight') for x, y in _CIRCLE['BottomRight']['Area']]
         
         return coordinates
+    
+    def _mask(self, mask_type, border=0):
+        """Get the mask of the fill or outline, and the position to draw it.
+        The mask is calculated once for each size of key.
+        """
+        key = (mask_type, self.x_len, self.y_len, border)
+        try:
+            mask, (x, y) = _MASK_CACHE[key]
+        except KeyError:
+            button = KeyboardButton(0, 0, self.x_len, self.y_len)
+            if mask_type == 'Outline':
+                coordinates = button.outline(border)
+            else:
+                coordinates = button.fill()
+            mask, (x, y) = _MASK_CACHE[key] = numpy.coordinates_to_mask(coordinates)
+        return mask, (self.x + x, self.y + y)
+    
+    def outline_mask(self, border=0):
+        return self._mask('Outline', border)
+    
+    def fill_mask(self):
+        return self._mask('Fill')
 
 
 class KeyboardGrid(object):
@@ -169,9 +201,76 @@ class KeyboardGrid(object):
                    'HideBorder': hide_border}
         self.row.append(_values)
 
+    def _geometry_key(self):
+        """Get everything the position and shape of the keys depend on."""
+        layout = tuple(tuple((values['Name'], values['DimensionMultipliers'], values['HideBorder'], values['CustomColour'])
+                             for values in row) for row in self.grid)
+        sizes = (KEY_SIZE, KEY_CORNER_RADIUS, KEY_PADDING, KEY_BORDER, IMAGE_PADDING, DROP_SHADOW_Y)
+        return (layout, sizes)
+    
+    def calculate_geometry(self):
+        """Get the position and shape of every key, along with the image size.
+        This only depends on the layout and sizes, so is cached in memory and on disk.
+        """
+        key = self._geometry_key()
+        try:
+            return _GEOMETRY_CACHE[key]
+        except KeyError:
+            pass
+        
+        disk_key = cache_key('KeyboardGeometry', key)
+        geometry = _GEOMETRY_DISK_CACHE.get(disk_key)
+        if geometry is None:
+            geometry = self._calculate_geometry()
+            _GEOMETRY_DISK_CACHE.set(disk_key, geometry)
+        _GEOMETRY_CACHE[key] = geometry
+        return geometry
+    
+    def _calculate_geometry(self):
+        keys = []
+        max_offset = {'X': 0, 'Y': 0}
+        
+        y_offset = IMAGE_PADDING
+        y_current = 0
+        for i, row in enumerate(self.grid):
+            x_offset = IMAGE_PADDING
+            
+            for values in row:
+            
+                x, y = values['Dimensions']
+                
+                if values['Name'] is not None:
+                    button_coordinates = KeyboardButton(x_offset, y_offset, x, y)
+                    if values['HideBorder'] or not KEY_BORDER:
+                        outline = None
+                    else:
+                        outline = button_coordinates.outline_mask(KEY_BORDER)
+                    keys.append({'Name': values['Name'],
+                                 'Offset': (x_offset, y_offset),
+                                 'Dimensions': values['DimensionMultipliers'],
+                                 'CustomColour': values['CustomColour'],
+                                 'Fill': button_coordinates.fill_mask(),
+                                 'Outline': outline})
+                
+                x_offset += KEY_PADDING + x
+                y_current = max(y_current, y)
+
+            #Decrease size of empty row
+            if row:
+                y_offset += KEY_SIZE + KEY_PADDING
+            else:
+                y_offset += (KEY_SIZE + KEY_PADDING) // 2
+            
+            max_offset['X'] = max(max_offset['X'], x_offset)
+            max_offset['Y'] = max(max_offset['Y'], y_offset)
+            y_current -= KEY_SIZE
+        
+        width = max_offset['X'] + IMAGE_PADDING - KEY_PADDING + 1
+        height = max_offset['Y'] + IMAGE_PADDING + y_current - KEY_PADDING * 2 + 1 + DROP_SHADOW_Y
+        return ((width, height), keys)
+
     def generate_coordinates(self, key_names={}):
         image = {'Fill': {}, 'Outline': [], 'Text': []}
-        max_offset = {'X': 0, 'Y': 0}
         
         if CONFIG['GenerateKeyboard']['LinearMapping']:
             if CONFIG['GenerateKeyboard']['LinearPower'] != 1:
@@ -213,82 +312,58 @@ class KeyboardGrid(object):
             image['Background'] = self.colours['black']['Colour']
             image['Shadow'] = self.colours['white']['Colour']
         
-        y_offset = IMAGE_PADDING
-        y_current = 0
-        for i, row in enumerate(self.grid):
-            x_offset = IMAGE_PADDING
+        (width, height), keys = self.calculate_geometry()
+        for values in keys:
+            hide_background = False
             
-            for values in row:
+            count_time = self.count_time.get(values['Name'], 0)
+            count_press = self.count_press.get(values['Name'], 0)
+            if use_time:
+                key_count = count_time
+            elif use_count:
+                key_count = count_press
+            display_name = key_names.get(values['Name'], values['Name'])
             
-                x, y = values['Dimensions']
-                hide_background = False
-                
-                if values['Name'] is not None:
-                    count_time = self.count_time.get(values['Name'], 0)
-                    count_press = self.count_press.get(values['Name'], 0)
-                    if use_time:
-                        key_count = count_time
-                    elif use_count:
-                        key_count = count_press
-                    display_name = key_names.get(values['Name'], values['Name'])
-
-                    button_coordinates = KeyboardButton(x_offset, y_offset, x, y)
-                    
-                    #Calculate colour for key
-                    if values['CustomColour'] is None:
-                        if mapping == 'standard':
-                            fill_colour = colour_range[lookup[key_count]]
-                        elif mapping == 'exponential':
-                            fill_colour = colour_range[key_count ** exponential]
-                        else:
-                            fill_colour = colour_range[key_count]
-                    else:
-                        if values['CustomColour'] == False:
-                            hide_background = True
-                            fill_colour = image['Background']
-                        else:
-                            fill_colour = values['CustomColour']
-                    
-                    #Calculate colour for border
-                    if get_luminance(*fill_colour) > 128:
-                        text_colour = self.colours['black']['Colour']
-                    else:
-                        text_colour = self.colours['white']['Colour']
-                    
-                    #Store values
-                    _values = {'Offset': (x_offset, y_offset),
-                               'KeyName': display_name,
-                               'Counts': {'press': count_press, 'time': count_time},
-                               'Colour': text_colour,
-                               'Dimensions': values['DimensionMultipliers']}
-                    image['Text'].append(_values)
-
-                    if not values['HideBorder']:
-                        image['Outline'] += button_coordinates.outline(KEY_BORDER)
-                    if not hide_background:
-                        try:
-                            image['Fill'][fill_colour] += button_coordinates.fill()
-                        except KeyError:
-                            image['Fill'][fill_colour] = button_coordinates.fill()
-                
-                x_offset += KEY_PADDING + x
-                y_current = max(y_current, y)
-
-            #Decrease size of empty row
-            if row:
-                y_offset += KEY_SIZE + KEY_PADDING
+            #Calculate colour for key
+            if values['CustomColour'] is None:
+                if mapping == 'standard':
+                    fill_colour = colour_range[lookup[key_count]]
+                elif mapping == 'exponential':
+                    fill_colour = colour_range[key_count ** exponential]
+                else:
+                    fill_colour = colour_range[key_count]
             else:
-                y_offset += (KEY_SIZE + KEY_PADDING) // 2
+                if values['CustomColour'] == False:
+                    hide_background = True
+                    fill_colour = image['Background']
+                else:
+                    fill_colour = values['CustomColour']
             
-            max_offset['X'] = max(max_offset['X'], x_offset)
-            max_offset['Y'] = max(max_offset['Y'], y_offset)
-            y_current -= KEY_SIZE
+            #Calculate colour for border
+            if get_luminance(*fill_colour) > 128:
+                text_colour = self.colours['black']['Colour']
+            else:
+                text_colour = self.colours['white']['Colour']
+            
+            #Store values
+            _values = {'Offset': values['Offset'],
+                       'KeyName': display_name,
+                       'Counts': {'press': count_press, 'time': count_time},
+                       'Colour': text_colour,
+                       'Dimensions': values['Dimensions']}
+            image['Text'].append(_values)
+
+            if values['Outline'] is not None:
+                image['Outline'].append(values['Outline'])
+            if not hide_background:
+                try:
+                    image['Fill'][fill_colour].append(values['Fill'])
+                except KeyError:
+                    image['Fill'][fill_colour] = [values['Fill']]
         
-        width = max_offset['X'] + IMAGE_PADDING - KEY_PADDING + 1
-        height = max_offset['Y'] + IMAGE_PADDING + y_current - KEY_PADDING * 2 + 1 + DROP_SHADOW_Y
         return ((width, height), image)
 
-
+        
 def format_amount(value, value_type, max_length=5, min_length=None, decimal_units=False):
     """Format the count for something that will fit on a key."""
     if value_type == 'press':
@@ -373,7 +448,7 @@ class DrawKeyboard(object):
     
     def reload(self, data=None):
         if data is None:
-            data = load_data(self.name)
+            data = load_data(self.name, _lazy=True)
         if self.last_session:
             self.key_counts = data['Keys']['Session']
             self.ticks = data['Ticks']['Total'] - data['Ticks']['Session']['Total']
@@ -412,7 +487,7 @@ class DrawKeyboard(object):
         image = Image.new('RGB', (data['Width'], data['Height']))
         background = tuple(list(data['Coordinates']['Background'][:3]) + [0])
         image.paste(data['Coordinates']['Background'], (0, 0, data['Width'], data['Height']))
-        pixels = image.load()
+        pixels = numpy.array(image)
 
         #Add drop shadow
         shadow = (64, 64, 64)
@@ -420,20 +495,21 @@ class DrawKeyboard(object):
             Message(self.string['draw']['shadow'])
             shadow_colour = tuple(int(pow(i + 30, 0.9625)) for i in data['Coordinates']['Shadow'])
             for colour in data['Coordinates']['Fill']:
-                for x, y in data['Coordinates']['Fill'][colour]:
-                    pixels[DROP_SHADOW_X+x, DROP_SHADOW_Y+y] = shadow
+                for mask, (x, y) in data['Coordinates']['Fill'][colour]:
+                    numpy.paste_mask(pixels, mask, (DROP_SHADOW_X+x, DROP_SHADOW_Y+y), shadow)
     
         #Fill colours
         Message(self.string['draw']['keys'])
         for colour in data['Coordinates']['Fill']:
-            for x, y in data['Coordinates']['Fill'][colour]:
-                pixels[x, y] = colour
+            for mask, offset in data['Coordinates']['Fill'][colour]:
+                numpy.paste_mask(pixels, mask, offset, colour[:3])
 
         #Draw border
         Message(self.string['draw']['outline'])
-        border = tuple(255 - i for i in data['Coordinates']['Background'])
-        for x, y in data['Coordinates']['Outline']:
-            pixels[x, y] = border
+        border = tuple(255 - i for i in data['Coordinates']['Background'][:3])
+        for mask, offset in data['Coordinates']['Outline']:
+            numpy.paste_mask(pixels, mask, offset, border)
+        image = Image.fromarray(pixels)
     
         #Draw text
         Message(self.string['draw']['text'])
@@ -3,7 +3,9 @@ This is part of the Mouse Tracks Python application.
 Source: https://github.com/Peter92/MouseTracks
 """
 
-from __future__ import absolute_import
+from __future__ import absolute_import, division
+
+import core.numpy as numpy
 
 try:
     from core.image.scipy.gaussian import gaussian_filter
@@ -13,11 +15,51 @@ except ImportError:
     from scipy.ndimage.interpolation import zoom
     
 
-def blur(array, size):
+#Above this size, a FFT blur is faster than the direct one
+FFT_MIN_SIGMA = 8
+
+#Smallest size to keep when automatically downscaling for each accuracy
+DOWNSCALE_MIN_SIGMA = {'high': None, 'medium': FFT_MIN_SIGMA, 'low': 4}
+
+
+def blur(array, size, accuracy='high', downscale=0):
+    """Apply a gaussian blur.
+    
+    A high accuracy gives an exact result, medium will blur a smaller copy
+    of the array, and low will also approximate the blur with box filters.
+    Set downscale to override how much smaller the copy is, or 1 to disable it.
+    The result is always a float64 array, whichever method is used.
+    """
+    if array.dtype != 'float64':
+        array = numpy.set_type(array, 'float64')
+    
+    if not downscale:
+        min_sigma = DOWNSCALE_MIN_SIGMA.get(accuracy)
+        downscale = int(size // min_sigma) if min_sigma else 1
+    
+    if downscale > 1 and array.ndim == 2 and array.shape[0] >= downscale and array.shape[1] >= downscale:
+        height, width = array.shape
+        small_height = height // downscale
+        small_width = width // downscale
+        cropped = array[:small_height * downscale, :small_width * downscale]
+        small = cropped.reshape(small_height, downscale, small_width, downscale).mean(axis=(1, 3))
+        blurred = blur(small, size / downscale, accuracy=accuracy, downscale=1)
+        return zoom(blurred, (height / small_height, width / small_width), order=1)
+    
+    if accuracy == 'low':
+        return numpy.box_blur(array, size)
+    if size >= FFT_MIN_SIGMA:
+        return numpy.fft_blur(array, size)
     return gaussian_filter(array, sigma=size)
 
     
 def upscale(array, factor):
     if factor[0] == 1 and factor[1] == 1:
         return array
+    
+    #Skip the zoom if the scale results in a whole number of pixels
+    if array.ndim == 2 and array.size:
+        shape = tuple(int(round(size * zoom_factor)) for size, zoom_factor in zip(array.shape, factor))
+        if all(abs(size * zoom_factor - new_size) < 1e-6 for size, zoom_factor, new_size in zip(array.shape, factor, shape)):
+            return numpy.scale(array, shape)
     return zoom(array, factor, order=0)
\ No newline at end of file
@@ -49,43 +49,31 @@ def calculate_line(start, end):
         return result
     
     #Step along line by pixel until end is reached
-    slope = difference[1] / difference[0]
-    count = slope
+    #The counter is the slope multiplied by the x distance, so that it stays
+    #as an integer and doesn't build up floating point errors over long lines
+    #This gives the same path as a float slope would without any rounding,
+    #but around one line in six will have at least one pixel moved compared to it
+    x_distance = abs(difference[0])
+    y_distance = abs(difference[1])
+    count = y_distance
     x, y = start
     x_neg = -1 if difference[0] < 0 else 1
     y_neg = -1 if difference[1] < 0 else 1
     i = 0
     while True:
         i += 1
-        
+
         #Stop if it appears to be an infinite loop
         if i > 100000:
             raise ValueError('failed to find path between {}, {}'.format(start, end))
-        
-        #If y > x and both pos or both neg
-        if slope >= 1 or slope <= 1:
-            if count >= 1:
-                y += y_neg
-                count -= 1
-            elif count <= -1:
-                y += y_neg
-                count += 1
-            else:
-                x += x_neg
-                count += slope
-                
-        # If y < x and both pos or both neg
-        elif slope:
-            if count >= 1:
-                y += y_neg
-                count -= 1
-            elif count <= -1:
-                y += y_neg
-                count += 1
-            if -1 <= count <= 1:
-                x += x_neg
-            count += slope
-            
+
+        if count >= x_distance:
+            y += y_neg
+            count -= x_distance
+        else:
+            x += x_neg
+            count += y_distance
+
         coordinate = (x, y)
         if coordinate == end:
             return result
@@ -7,7 +7,8 @@ from __future__ import division, absolute_import
 
 import numpy
 
-from core.compatibility import StringIO, BytesIO
+from core.compatibility import StringIO, BytesIO, get_items
+from core.maths import round_int
 
 
 _NUMPY_DTYPES = {
@@ -33,6 +34,16 @@ _NUMPY_DTYPES = {
 }
 
 
+_LARGER_DTYPES = {
+    'uint8': 'uint16',
+    'uint16': 'uint32',
+    'uint32': 'uint64',
+    'int8': 'int16',
+    'int16': 'int32',
+    'int32': 'int64',
+}
+
+
 def _get_dtype(dtype):
     try:
         return _NUMPY_DTYPES[dtype]
@@ -40,6 +51,19 @@ def _get_dtype(dtype):
         return None
 
 
+def _fit_dtype(dtype, max_value, min_value=0):
+    """Find the smallest data type, starting from dtype, that can hold a range of values."""
+    dtype = numpy.dtype(dtype)
+    if dtype.kind == 'u' and min_value < 0:
+        dtype = numpy.dtype(numpy.int64)
+    while dtype.kind in 'ui' and max_value > numpy.iinfo(dtype).max:
+        try:
+            dtype = numpy.dtype(_LARGER_DTYPES[dtype.name])
+        except KeyError:
+            return numpy.dtype(numpy.float64)
+    return dtype
+
+
 def set_type(array, dtype):
     if isinstance(dtype, str):
         return array.astype(_get_dtype(dtype))
@@ -47,13 +71,17 @@ def set_type(array, dtype):
         return array.astype(dtype)
         
         
-def array(array, create=False, dtype=None):
+def array(array, create=False, dtype=None, tiled=False):
     if create:
+        if tiled:
+            return TiledArray(array[::-1], dtype=_get_dtype(dtype))
         return numpy.zeros(array[::-1], dtype=_get_dtype(dtype))
     return numpy.array(array, dtype=_get_dtype(dtype))
 
-    
+
 def count(array):
+    if isinstance(array, TiledArray):
+        return array.count()
     return (array > 0).sum()
     
     
@@ -67,6 +95,8 @@ def sum(array):
     
 def min(array, value=None):
     if value is None:
+        if isinstance(array, TiledArray):
+            return array.min()
         return numpy.amin(array)
     array[array > value] = value
     return array
@@ -74,6 +104,8 @@ def min(array, value=None):
     
 def max(array, value=None):
     if value is None:
+        if isinstance(array, TiledArray):
+            return array.max()
         return numpy.amax(array)
     array[array < value] = value
     return array
@@ -95,6 +127,24 @@ def divide(array, amount, as_int=False, dtype=None):
     return numpy.true_divide(array, amount, dtype=_get_dtype(dtype))
 
 
+def promote(array, value):
+    """Convert an array to a larger data type if a value will not fit in it.
+    If no change is needed, the same array is returned.
+    """
+    dtype = _fit_dtype(array.dtype, value)
+    if dtype == array.dtype:
+        return array
+    return array.astype(dtype)
+
+
+def fit_type(array, dtype):
+    """Convert an array to a data type, or a larger one if the values will not fit."""
+    dtype = _fit_dtype(_get_dtype(dtype) or dtype, max(array), min(array))
+    if dtype == array.dtype:
+        return array
+    return array.astype(dtype)
+
+
 def round(array, decimals=0, dtype=None):
     new_array = numpy.round(array, decimals)
     if dtype is not None:
@@ -126,19 +176,19 @@ def merge(arrays, merge_type, dtype=None):
         return None
     
     elif merge_type.startswith('max'):
-        return numpy.maximum.reduce(arrays, dtype=_get_dtype(dtype))
+        return _merge_inplace(numpy.maximum, arrays, dtype)
         
     elif merge_type.startswith('min'):
-        return numpy.minimum.reduce(arrays, dtype=_get_dtype(dtype))
+        return _merge_inplace(numpy.minimum, arrays, dtype)
         
     elif merge_type.startswith('add'):
-        return numpy.add.reduce(arrays, dtype=_get_dtype(dtype))
+        return _merge_inplace(numpy.add, arrays, dtype)
         
     elif merge_type.startswith('sub'):
         return numpy.subtract.reduce(arrays, dtype=_get_dtype(dtype))
         
     elif merge_type.startswith('mul'):
-        return numpy.multiply.reduce(arrays, dtype=_get_dtype(dtype))
+        return _merge_inplace(numpy.multiply, arrays, dtype)
         
     elif merge_type.startswith('div'):
         return numpy.divide.reduce(arrays, dtype=_get_dtype(dtype))
@@ -146,17 +196,482 @@ def merge(arrays, merge_type, dtype=None):
     return arrays[0]
 
 
+def _merge_inplace(ufunc, arrays, dtype=None):
+    """Merge arrays one at a time into a single output.
+    This avoids stacking every array into one large copy first.
+    """
+    dtype = _get_dtype(dtype)
+    if dtype is None:
+        dtype = numpy.result_type(*arrays)
+    result = numpy.array(arrays[0], dtype=dtype)
+    for array in arrays[1:]:
+        ufunc(result, array, out=result, casting='unsafe')
+    return result
+
+
+def scale(array, shape):
+    """Resize a 2D array using the nearest values.
+    Whole number scales repeat each value through a broadcast view,
+    otherwise the rows and columns are picked by index,
+    in the same way as an order 0 zoom.
+    """
+    height, width = array.shape
+    new_height, new_width = shape
+    if not new_height % height and not new_width % width:
+        repeat_y = new_height // height
+        repeat_x = new_width // width
+        view = numpy.broadcast_to(array[:, None, :, None], (height, repeat_y, width, repeat_x))
+        return view.reshape(shape)
+    rows = _scale_indexes(height, new_height)
+    columns = _scale_indexes(width, new_width)
+    return array.take(rows, axis=0).take(columns, axis=1)
+
+
+def resample(array, shape, merge_type='max'):
+    """Resize a 2D array to any shape.
+    Where an axis gets smaller, each group of values is merged with either
+    'max' or 'add', so that nothing is skipped over.
+    """
+    if merge_type.startswith('add'):
+        ufunc = numpy.add
+        dtype = numpy.promote_types(array.dtype, numpy.int64)
+    else:
+        ufunc = numpy.maximum
+        dtype = array.dtype
+    
+    result = array
+    for axis, new_size in enumerate(shape):
+        size = result.shape[axis]
+        if new_size < size:
+            edges = numpy.arange(new_size) * size // new_size
+            result = ufunc.reduceat(result, edges, axis=axis, dtype=dtype)
+        elif new_size > size:
+            result = result.take(_scale_indexes(size, new_size), axis=axis)
+    return result
+
+
+def _scale_indexes(size, new_size):
+    """Find the nearest original index for each new index."""
+    if new_size == 1:
+        return numpy.zeros(1, dtype=numpy.intp)
+    ratio = (size - 1) / (new_size - 1)
+    return numpy.floor(numpy.arange(new_size) * ratio + 0.5).astype(numpy.intp)
+
+
+def _gaussian_kernel(sigma, truncate=4.0):
+    """Create a normalised 1D gaussian kernel."""
+    radius = int(truncate * sigma + 0.5)
+    x = numpy.arange(-radius, radius + 1)
+    kernel = numpy.exp(-0.5 * (x / sigma) ** 2)
+    return kernel / kernel.sum()
+
+
+def fft_blur(array, sigma, truncate=4.0):
+    """Gaussian blur using FFT convolution along each axis.
+    The edges are reflected in the same way as the direct gaussian filter,
+    but the speed does not depend on the size of the kernel.
+    """
+    result = numpy.asarray(array, dtype=numpy.float64)
+    kernel = _gaussian_kernel(sigma, truncate)
+    radius = kernel.size // 2
+    for axis in range(result.ndim):
+        size = result.shape[axis]
+        padding = [(0, 0)] * result.ndim
+        padding[axis] = (radius, radius)
+        padded = numpy.pad(result, padding, mode='symmetric')
+        fft_size = _fft_size(padded.shape[axis] + kernel.size - 1)
+        
+        kernel_shape = [1] * result.ndim
+        kernel_shape[axis] = -1
+        kernel_fft = numpy.fft.rfft(kernel, fft_size).reshape(kernel_shape)
+        convolved = numpy.fft.irfft(numpy.fft.rfft(padded, fft_size, axis=axis) * kernel_fft, fft_size, axis=axis)
+        result = numpy.take(convolved, numpy.arange(2 * radius, 2 * radius + size), axis=axis)
+    return result
+
+
+def _fft_size(size):
+    """Find a size at least as large that only has small prime factors."""
+    best = 2 ** int(numpy.ceil(numpy.log2(size)))
+    power_3 = 1
+    while power_3 < best:
+        power_5 = power_3
+        while power_5 < best:
+            value = power_5
+            while value < size:
+                value *= 2
+            if value < best:
+                best = value
+            power_5 *= 5
+        power_3 *= 3
+    return best
+
+
+def box_blur(array, sigma, passes=3):
+    """Approximate a gaussian blur with repeated box filters.
+    Each pass is a running sum, so the speed does not depend on sigma.
+    """
+    result = numpy.asarray(array, dtype=numpy.float64)
+    radius = int(round((numpy.sqrt(12 * sigma ** 2 / passes + 1) - 1) / 2))
+    if radius < 1:
+        return result.copy()
+    width = 2 * radius + 1
+    padding = [(radius + 1, radius)] + [(0, 0)] * (result.ndim - 1)
+    for axis in range(result.ndim):
+        result = numpy.ascontiguousarray(numpy.moveaxis(result, axis, 0))
+        size = result.shape[0]
+        for _ in range(passes):
+            
+            #The extra value at the start is only used as the base of the sum
+            cumulative = numpy.cumsum(numpy.pad(result, padding, mode='symmetric'), axis=0)
+            result = cumulative[width:width + size] - cumulative[:size]
+            result /= width
+        result = numpy.moveaxis(result, 0, axis)
+    return numpy.ascontiguousarray(result)
+
+
+def lookup(table, indexes):
+    """Get the rows of a table for an array of indexes.
+    Any index outside the table is clamped to the first or last row.
+    """
+    return numpy.take(table, numpy.clip(indexes, 0, len(table) - 1), axis=0)
+
+
 def convert_to_dict(array, dictionary, dtype=None):
     """Assign dictionary values to array where key is the array value."""
     return vectorize(dictionary.__getitem__, dtype)(array)
 
 
-def remap_to_range(array, dtype=None):
-    """Remap an array to a 0-n range."""
-    values = {v: i for i, v in enumerate(sorted(set(array.ravel())))}
-    return convert_to_dict(array, values, dtype)
+def calculate_lines(segments, include_ends=False):
+    """Calculate the pixels between a batch of (start, end) points at once.
+    This follows the same path as core.maths.calculate_line,
+    but returns arrays of the x and y coordinates, and the index of
+    the segment each pixel belongs to.
+
+    If include_ends is set, the start and end points will also be
+    added to either side of each line.
+    """
+    if not segments:
+        empty = numpy.zeros(0, dtype=numpy.int64)
+        return empty, empty, empty
+
+    points = numpy.array([(round_int(start[0]), round_int(start[1]), round_int(end[0]), round_int(end[1]))
+                          for start, end in segments], dtype=numpy.int64).reshape(-1, 4)
+    start_x, start_y, end_x, end_y = points.T
+    x_sign = numpy.sign(end_x - start_x)
+    y_sign = numpy.sign(end_y - start_y)
+    x_distance = numpy.abs(end_x - start_x)
+    y_distance = numpy.abs(end_y - start_y)
+    segment_count = len(points)
+
+    #Each line is a list of columns, where each column steps along y
+    #A vertical line is a single column going straight to the end
+    num_columns = x_distance + 1
+    column_segment = numpy.repeat(numpy.arange(segment_count), num_columns)
+    column_start = numpy.cumsum(num_columns) - num_columns
+    column = numpy.arange(column_segment.size) - column_start[column_segment]
+    column_x_distance = x_distance[column_segment]
+    column_y_distance = y_distance[column_segment]
+    divisor = numpy.maximum(column_x_distance, 1)
+    column_low = column_y_distance * column // divisor
+    column_high = numpy.where(column_x_distance, column_y_distance * (column + 1) // divisor, column_y_distance)
+
+    #Expand each column into its pixels
+    num_pixels = column_high - column_low + 1
+    pixel_column = numpy.repeat(numpy.arange(column_segment.size), num_pixels)
+    pixel_start = numpy.cumsum(num_pixels) - num_pixels
+    x = column[pixel_column]
+    y = column_low[pixel_column] + numpy.arange(pixel_column.size) - pixel_start[pixel_column]
+    segment = column_segment[pixel_column]
+
+    #The path stops at the first pixel next to the end point,
+    #which is only kept if it isn't the end point itself
+    segment_start = pixel_start[column_start]
+    index = numpy.arange(segment.size) - segment_start[segment]
+    dx = x_distance[segment] - x
+    dy = y_distance[segment] - y
+    finished = (index > 0) & (numpy.abs(dx) <= 1) & (numpy.abs(dy) <= 1)
+    finished_segment, finished_index = numpy.unique(segment[finished], return_index=True)
+    stop = numpy.zeros(segment_count, dtype=numpy.int64)
+    stop[finished_segment] = index[finished][finished_index]
+    stop_pixel = stop[segment]
+    stop_pixel += (dx[segment_start + stop] | dy[segment_start + stop]).astype(bool)[segment]
+    keep = (index > 0) & (index < stop_pixel)
+
+    x = start_x[segment[keep]] + x[keep] * x_sign[segment[keep]]
+    y = start_y[segment[keep]] + y[keep] * y_sign[segment[keep]]
+    segment = segment[keep]
+
+    if include_ends:
+        segment_index = numpy.arange(segment_count)
+        order = numpy.argsort(numpy.concatenate((segment * 3 + 1, segment_index * 3, segment_index * 3 + 2)),
+                              kind='mergesort')
+        x = numpy.concatenate((x, start_x, end_x))[order]
+        y = numpy.concatenate((y, start_y, end_y))[order]
+        segment = numpy.concatenate((segment, segment_index, segment_index))[order]
+
+    return x, y, segment
+
+
+def calculate_line(start, end, include_ends=False):
+    """Calculate the pixels between two points as x and y arrays."""
+    x, y, segment = calculate_lines([(start, end)], include_ends=include_ends)
+    return x, y
+
+
+def scatter_max(array, y, x, values):
+    """Set array[y, x] to the highest of its current value and values."""
+    numpy.maximum.at(array, (y, x), numpy.asarray(values).astype(array.dtype))
+
+
+def coordinates_to_mask(coordinates):
+    """Convert a list of (x, y) coordinates to a boolean mask.
+    Returns the mask and the coordinate of its top left corner.
+    """
+    if not coordinates:
+        return numpy.zeros((0, 0), dtype=bool), (0, 0)
+    x, y = numpy.array(coordinates, dtype=numpy.int64).T
+    min_x = int(x.min())
+    min_y = int(y.min())
+    mask = numpy.zeros((int(y.max()) - min_y + 1, int(x.max()) - min_x + 1), dtype=bool)
+    mask[y - min_y, x - min_x] = True
+    return mask, (min_x, min_y)
+
+
+def paste_mask(array, mask, offset, value):
+    """Set the values of an array wherever a mask is True.
+    The mask is placed at an (x, y) offset, and anything outside the array is ignored.
+    """
+    x, y = offset
+    height, width = mask.shape[:2]
+    x1 = x if x > 0 else 0
+    y1 = y if y > 0 else 0
+    x2 = x + width if x + width < array.shape[1] else array.shape[1]
+    y2 = y + height if y + height < array.shape[0] else array.shape[0]
+    if x1 >= x2 or y1 >= y2:
+        return
+    mask = mask[y1 - y:y2 - y, x1 - x:x2 - x]
+    if array.ndim == 3:
+        mask = mask[:, :, None]
+    numpy.copyto(array[y1:y2, x1:x2], numpy.array(value, dtype=array.dtype), where=mask)
+
+
+_REMAP_LOOKUP_MAX = 2 ** 24
+
 
+def remap_to_range(array, dtype='float64', levels=None, sample_size=1000000):
+    """Remap an array to a 0-n range.
     
+    Each unique value is replaced by its position in the sorted list of values.
+    If levels is set, values are instead grouped into that many quantiles,
+    estimated from a sample of the array, which is much faster on large arrays.
+    The result is a float array unless another dtype is given.
+    """
+    array = numpy.asarray(array)
+    values = array.ravel()
+    
+    if levels is not None:
+        if values.size > sample_size:
+            sample = values[::values.size // sample_size]
+        else:
+            sample = values
+        edges = numpy.unique(numpy.percentile(sample, numpy.linspace(0, 100, levels + 1)))
+        result = numpy.searchsorted(edges[1:-1], values, side='right')
+    
+    else:
+        #Use a lookup table if the values are small positive integers
+        try:
+            if values.dtype.kind == 'f' and not numpy.array_equal(values, numpy.floor(values)):
+                raise ValueError('values are not integers')
+            if numpy.amin(values) < 0 or numpy.amax(values) >= _REMAP_LOOKUP_MAX:
+                raise ValueError('values out of range')
+            
+        except (ValueError, TypeError):
+            result = numpy.unique(values, return_inverse=True)[1]
+            
+        else:
+            integers = values.astype(numpy.int64)
+            exists = numpy.bincount(integers) > 0
+            result = (numpy.cumsum(exists) - 1)[integers]
+    
+    return result.reshape(array.shape).astype(_get_dtype(dtype))
+
+
+def quantile(array, fraction, unique=False):
+    """Find the value a fraction of the way through the sorted array.
+    
+    This uses a partial sort instead of a full sort, so runs in linear time.
+    If unique is set, the fraction is of the unique values instead.
+    Small positive integers are counted in linear time, but anything
+    else needs a full sort to find the unique values.
+    """
+    values = numpy.asarray(array).ravel()
+    
+    if unique:
+        if values.dtype.kind in 'iub' and numpy.amin(values) >= 0 and numpy.amax(values) < _REMAP_LOOKUP_MAX:
+            distinct = numpy.flatnonzero(numpy.bincount(values.astype(numpy.int64)))
+            index = numpy.clip(round_int(distinct.size * fraction), 0, distinct.size - 1)
+            return values.dtype.type(distinct[index])
+        
+        distinct = numpy.unique(values)
+        return distinct[numpy.clip(round_int(distinct.size * fraction), 0, distinct.size - 1)]
+    
+    index = numpy.clip(round_int(values.size * fraction), 0, values.size - 1)
+    return numpy.partition(values, index)[index]
+
+    
+class TiledArray(object):
+    """Sparse 2D array split into square tiles, where each tile is only created when written to.
+    
+    Reading a tile that doesn't exist gives 0, and numpy will see it as
+    a normal array if passed to any numpy function.
+    """
+    
+    TILE_SIZE = 64
+    
+    def __init__(self, shape, dtype=None, tile_size=TILE_SIZE):
+        self.shape = tuple(shape)
+        self.dtype = numpy.dtype(dtype)
+        self.tile_size = tile_size
+        self.tiles = {}
+    
+    @classmethod
+    def from_array(cls, array, tile_size=TILE_SIZE):
+        """Convert a normal array, skipping any tiles that are empty."""
+        tiled = cls(array.shape, array.dtype, tile_size)
+        for y in range(0, array.shape[0], tile_size):
+            for x in range(0, array.shape[1], tile_size):
+                section = array[y:y+tile_size, x:x+tile_size]
+                if section.any():
+                    tiled._get_tile(y // tile_size, x // tile_size, create=True)[:section.shape[0], :section.shape[1]] = section
+        return tiled
+    
+    @property
+    def ndim(self):
+        return len(self.shape)
+    
+    @property
+    def size(self):
+        return self.shape[0] * self.shape[1]
+    
+    @property
+    def num_tiles(self):
+        """Total number of tiles needed to cover the array."""
+        return (-(-self.shape[0] // self.tile_size)) * (-(-self.shape[1] // self.tile_size))
+        
+    def __len__(self):
+        return self.shape[0]
+    
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self.toarray()
+        return self.toarray().astype(dtype)
+    
+    def _get_tile(self, tile_y, tile_x, create=False):
+        try:
+            return self.tiles[(tile_y, tile_x)]
+        except KeyError:
+            if not create:
+                return None
+            tile = self.tiles[(tile_y, tile_x)] = numpy.zeros((self.tile_size, self.tile_size), dtype=self.dtype)
+            return tile
+    
+    def _split_index(self, key):
+        """Convert a (y, x) index into tile coordinates."""
+        try:
+            y, x = key
+        except (TypeError, ValueError):
+            raise IndexError('only (y, x) indexing is supported')
+        y = numpy.asarray(y)
+        x = numpy.asarray(x)
+        y = numpy.where(y < 0, y + self.shape[0], y)
+        x = numpy.where(x < 0, x + self.shape[1], x)
+        if (y < 0).any() or (y >= self.shape[0]).any() or (x < 0).any() or (x >= self.shape[1]).any():
+            raise IndexError('index out of bounds for shape {}'.format(self.shape))
+        return divmod(y, self.tile_size), divmod(x, self.tile_size)
+        
+    def __getitem__(self, key):
+        (tile_y, y), (tile_x, x) = self._split_index(key)
+        if not tile_y.ndim:
+            tile = self._get_tile(int(tile_y), int(tile_x))
+            if tile is None:
+                return self.dtype.type(0)
+            return tile[y, x]
+        
+        result = numpy.zeros(tile_y.shape, dtype=self.dtype)
+        for (i, j), tile in get_items(self.tiles):
+            matches = (tile_y == i) & (tile_x == j)
+            if matches.any():
+                result[matches] = tile[y[matches], x[matches]]
+        return result
+    
+    def __setitem__(self, key, value):
+        (tile_y, y), (tile_x, x) = self._split_index(key)
+        if not tile_y.ndim:
+            self._get_tile(int(tile_y), int(tile_x), create=True)[y, x] = value
+            return
+        
+        value = numpy.broadcast_to(numpy.asarray(value, dtype=self.dtype), tile_y.shape)
+        tile_coordinates = numpy.stack((tile_y.ravel(), tile_x.ravel()), axis=1)
+        for i, j in set(map(tuple, tile_coordinates.tolist())):
+            matches = (tile_y == i) & (tile_x == j)
+            self._get_tile(i, j, create=True)[y[matches], x[matches]] = value[matches]
+    
+    def _tile_views(self):
+        """Get each tile cropped to the size of the array."""
+        for (i, j), tile in get_items(self.tiles):
+            yield tile[:self.shape[0] - i * self.tile_size, :self.shape[1] - j * self.tile_size]
+    
+    def count(self):
+        total = 0
+        for tile in self._tile_views():
+            total += int((tile > 0).sum())
+        return total
+    
+    def min(self):
+        values = [numpy.amin(tile) for tile in self._tile_views()]
+        if len(self.tiles) < self.num_tiles:
+            values.append(0)
+        return self.dtype.type(numpy.amin(values)) if values else self.dtype.type(0)
+    
+    def max(self):
+        values = [numpy.amax(tile) for tile in self._tile_views()]
+        if len(self.tiles) < self.num_tiles:
+            values.append(0)
+        return self.dtype.type(numpy.amax(values)) if values else self.dtype.type(0)
+    
+    def toarray(self):
+        """Convert to a normal array."""
+        result = numpy.zeros(self.shape, dtype=self.dtype)
+        for (i, j), tile in get_items(self.tiles):
+            section = result[i*self.tile_size:(i+1)*self.tile_size, j*self.tile_size:(j+1)*self.tile_size]
+            section[...] = tile[:section.shape[0], :section.shape[1]]
+        return result
+    
+    def copy(self):
+        tiled = TiledArray(self.shape, self.dtype, self.tile_size)
+        tiled.tiles = {k: v.copy() for k, v in get_items(self.tiles)}
+        return tiled
+    
+    def fill(self, value):
+        self.tiles = {}
+        if value:
+            for i in range(-(-self.shape[0] // self.tile_size)):
+                for j in range(-(-self.shape[1] // self.tile_size)):
+                    self._get_tile(i, j, create=True).fill(value)
+    
+    def astype(self, dtype):
+        tiled = TiledArray(self.shape, dtype, self.tile_size)
+        tiled.tiles = {k: v.astype(tiled.dtype) for k, v in get_items(self.tiles)}
+        return tiled
+
+
+def dense(array):
+    """Make sure an array is a normal numpy array."""
+    if isinstance(array, TiledArray):
+        return array.toarray()
+    return array
+    
+
 def csv(array):
     f = StringIO
     numpy.savetxt(f, array, fmt='%d', delimiter=',')
@@ -174,6 +689,29 @@ def load(saved_array):
     f.write(saved_array)
     f.seek(0)
     return numpy.load(f)
+
+
+def save_tiled(array):
+    """Save a TiledArray as its shape, followed by the tile coordinates and the tiles."""
+    f = BytesIO()
+    coordinates = sorted(array.tiles)
+    numpy.save(f, numpy.array(array.shape + (array.tile_size,), dtype=numpy.int64), fix_imports=True)
+    numpy.save(f, numpy.array(coordinates, dtype=numpy.int64).reshape(-1, 2), fix_imports=True)
+    numpy.save(f, numpy.array([array.tiles[k] for k in coordinates], dtype=array.dtype).reshape(-1, array.tile_size, array.tile_size), fix_imports=True)
+    return f.getvalue()
+
+
+def load_tiled(saved_array):
+    """Load an array saved with save_tiled."""
+    f = BytesIO()
+    f.write(saved_array)
+    f.seek(0)
+    height, width, tile_size = numpy.load(f).tolist()
+    coordinates = numpy.load(f).tolist()
+    tiles = numpy.load(f)
+    tiled = TiledArray((height, width), tiles.dtype, tile_size)
+    tiled.tiles = {tuple(k): tile for k, tile in zip(coordinates, tiles)}
+    return tiled
     
 
 def fill(array, value):
@@ -0,0 +1,69 @@
+"""
+This is part of the Mouse Tracks Python application.
+Source: https://github.com/Peter92/MouseTracks
+"""
+#Buffer of input events pushed by a hook, to be read once per tick
+
+from __future__ import absolute_import
+
+import time
+from collections import deque
+
+
+KEY_EVENT = 0
+
+MOUSE_EVENT = 1
+
+MOUSE_BUTTONS = 3
+
+#Maximum number of events to hold between ticks
+BUFFER_SIZE = 4096
+
+
+class InputEvents(object):
+    """Store key and mouse button events as they happen.
+    Events are pushed from the hook thread, and drained by the tracking loop.
+    If nothing reads the buffer, the oldest events will be dropped.
+    """
+    def __init__(self, size=BUFFER_SIZE):
+        self.events = deque(maxlen=size)
+        self.keys_held = set()
+        self.buttons_held = set()
+        self.hook = None
+
+    def push(self, event_type, value, pressed):
+        """Add an event to the buffer.
+        The value is the key name or mouse button index.
+        """
+        self.events.append((time.time(), event_type, value, pressed))
+
+    def drain(self):
+        """Read all events since the last call.
+        Returns:
+            Set of keys that were down at any point, so presses shorter
+            than a tick are still counted, and a tuple of the mouse buttons
+            in the same format as get_mouse_click.
+        """
+        events = []
+        while self.events:
+            events.append(self.events.popleft())
+
+        keys = set(self.keys_held)
+        buttons = set(self.buttons_held)
+        for event_time, event_type, value, pressed in events:
+            if event_type == KEY_EVENT:
+                held, seen = self.keys_held, keys
+            else:
+                held, seen = self.buttons_held, buttons
+            if pressed:
+                held.add(value)
+                seen.add(value)
+            else:
+                held.discard(value)
+        return keys, tuple(i in buttons for i in range(MOUSE_BUTTONS))
+
+    def stop(self):
+        """Stop the hook sending events."""
+        if self.hook is not None:
+            self.hook.cancel()
+            self.hook = None
@@ -5,8 +5,10 @@ Source: https://github.com/Peter92/MouseTracks
 
 from __future__ import absolute_import
 
-import subprocess
+import os
 import re
+import subprocess
+import time
 
 try:
     from core.os.linux.xlib import *
@@ -14,13 +16,73 @@ except ImportError:
     pass
 
 
+PROC_FOLDER = '/proc'
+
+#New processes are read again for this many seconds, in case a launcher replaces itself
+_PROCESS_RECHECK_TIME = 10
+
+
+class _ProcessScanner(object):
+    """Read the running processes from /proc.
+    Each process is cached by its ID, so only new ones need reading.
+    """
+    def __init__(self):
+        self.cache = {}
+
+    def _read(self, pid):
+        """Get the name of a process.
+        Returns None if it has ended or is a session leader.
+        """
+        try:
+            with open('{}/{}/stat'.format(PROC_FOLDER, pid), 'rb') as f:
+                stat = f.read().decode('utf-8', 'replace')
+        except (IOError, OSError):
+            return None
+        
+        #The name is in brackets and may contain spaces, so split after it
+        name_end = stat.rfind(')')
+        try:
+            session = int(stat[name_end+2:].split()[3])
+        except (IndexError, ValueError):
+            return None
+            
+        #Session leaders are ignored to match "ps -d"
+        if session == pid:
+            return None
+        return stat[stat.find('(')+1:name_end]
+
+    def scan(self):
+        """Get the name of each process, with the highest ID as the value."""
+        now = time.time()
+        cache = {}
+        processes = {}
+        for folder in os.listdir(PROC_FOLDER):
+            if not folder.isdigit():
+                continue
+            pid = int(folder)
+            try:
+                name, first_seen = self.cache[pid]
+            except KeyError:
+                name, first_seen = self._read(pid), now
+            else:
+                if now - first_seen < _PROCESS_RECHECK_TIME:
+                    name = self._read(pid)
+            cache[pid] = (name, first_seen)
+            
+            if name is not None and processes.get(name, -1) < pid:
+                processes[name] = pid
+        self.cache = cache
+        return processes
+
+
+_PROCESS_SCANNER = _ProcessScanner()
+
+
 def get_running_processes():
-    pids = []
-    program_list = subprocess.Popen('ps -d', shell=True, stdout=subprocess.PIPE).communicate()[0]
-    for line in program_list.splitlines():
-        pids.append(line.decode())
-    output = {line.rsplit()[-1]: line.rsplit()[0] for line in pids}
-    return output
+    """Return a dictionary of running processes, with their ID as the value.
+    The ID is used to determine which process was most recently loaded.
+    """
+    return _PROCESS_SCANNER.scan()
 
 
 def get_refresh_rate():
@@ -5,19 +5,170 @@ Source: https://github.com/Peter92/MouseTracks
 
 from __future__ import absolute_import
 
-from Xlib import display
+import os
 
+from Xlib import X, XK, display, error
+from Xlib.ext import randr
+
+from core.os.events import InputEvents, KEY_EVENT, MOUSE_EVENT
 from core.os.linux.xlib.pyxhook import HookManager
 
 
+#Match the X key names to the keys being tracked
+_KEY_NAMES = {
+    'BackSpace': 'BACK',
+    'Tab': 'TAB',
+    'Clear': 'CLEAR',
+    'Return': 'RETURN',
+    'Pause': 'PAUSE',
+    'Caps_Lock': 'CAPSLOCK',
+    'Escape': 'ESC',
+    'space': 'SPACE',
+    'Prior': 'PGUP',
+    'Next': 'PGDOWN',
+    'End': 'END',
+    'Home': 'HOME',
+    'Left': 'LEFT',
+    'Up': 'UP',
+    'Right': 'RIGHT',
+    'Down': 'DOWN',
+    'Insert': 'INSERT',
+    'Delete': 'DELETE',
+    'Super_L': 'LWIN',
+    'Super_R': 'RWIN',
+    'Menu': 'MENU',
+    'Shift_L': 'LSHIFT',
+    'Shift_R': 'RSHIFT',
+    'Control_L': 'LCTRL',
+    'Control_R': 'RCTRL',
+    'Alt_L': 'LALT',
+    'Alt_R': 'RALT',
+    'Num_Lock': 'NUMLOCK',
+    'Scroll_Lock': 'SCROLLLOCK',
+    'KP_Insert': 'NUM0',
+    'KP_End': 'NUM1',
+    'KP_Down': 'NUM2',
+    'KP_Next': 'NUM3',
+    'KP_Left': 'NUM4',
+    'KP_Begin': 'NUM5',
+    'KP_Right': 'NUM6',
+    'KP_Home': 'NUM7',
+    'KP_Up': 'NUM8',
+    'KP_Prior': 'NUM9',
+    'KP_Multiply': 'MULTIPLY',
+    'KP_Add': 'ADD',
+    'KP_Subtract': 'SUBTRACT',
+    'KP_Delete': 'DECIMAL',
+    'KP_Decimal': 'DECIMAL',
+    'KP_Divide': 'DIVIDE',
+    'semicolon': 'COLON',
+    'equal': 'EQUALS',
+    'comma': 'COMMA',
+    'minus': 'UNDERSCORE',
+    'period': 'PERIOD',
+    'slash': 'FORWARDSLASH',
+    'apostrophe': 'AT',
+    'bracketleft': 'LBRACKET',
+    'backslash': 'BACKSLASH',
+    'bracketright': 'RBRACKET',
+    'numbersign': 'HASH',
+    'grave': 'TILDE'
+}
+for i in range(10):
+    _KEY_NAMES['KP_{}'.format(i)] = 'NUM{}'.format(i)
+    _KEY_NAMES[str(i)] = str(i)
+for i in range(1, 25):
+    _KEY_NAMES['F{}'.format(i)] = 'F{}'.format(i)
+for c in 'abcdefghijklmnopqrstuvwxyz':
+    _KEY_NAMES[c] = c.upper()
+
+_KEYSYMS = {XK.string_to_keysym(k): v for k, v in _KEY_NAMES.items()}
+
+#X button numbers in the same order as get_mouse_click
+_MOUSE_BUTTONS = {1: 0, 2: 1, 3: 2}
+
+
+class _Display(object):
+    """Keep a single connection to the X server for each process.
+    The resolution is cached until the root window sends an event
+    to say the screen has changed.
+    """
+    def __init__(self):
+        self.display = None
+        self.pid = None
+
+    def connect(self):
+        """Open a new connection, and listen for screen changes."""
+        self.close()
+        self.display = display.Display()
+        self.pid = os.getpid()
+        self.root = self.display.screen().root
+        self.screen_size = None
+        self.root.change_attributes(event_mask=X.StructureNotifyMask)
+        if self.display.has_extension('RANDR'):
+            self.root.xrandr_select_input(randr.RRScreenChangeNotifyMask)
+        self.display.flush()
+
+    def close(self):
+        """Close the connection if it belongs to this process."""
+        if self.display is not None and self.pid == os.getpid():
+            try:
+                self.display.close()
+            except (error.ConnectionClosedError, EnvironmentError):
+                pass
+        self.display = None
+
+    def get(self):
+        """Get the display, reconnecting if the process was forked."""
+        if self.display is None or self.pid != os.getpid():
+            self.connect()
+        return self.display
+
+    def run(self, func):
+        """Run a function with the display.
+        If the connection has failed, it will reconnect and try once more.
+        """
+        try:
+            return func(self.get())
+        except (error.ConnectionClosedError, error.XError, EnvironmentError):
+            self.close()
+            return func(self.get())
+
+    def _cursor_pos(self, d):
+        pointer = self.root.query_pointer()
+        return (pointer.root_x, pointer.root_y)
+
+    def _resolution(self, d):
+        
+        #Only screen change events are selected, so any event means the cache is old
+        changed = False
+        for _ in range(d.pending_events()):
+            d.next_event()
+            changed = True
+        if changed or self.screen_size is None:
+            geometry = self.root.get_geometry()
+            self.screen_size = (geometry.width, geometry.height)
+        return self.screen_size
+
+    def cursor_pos(self):
+        return self.run(self._cursor_pos)
+
+    def resolution(self):
+        return self.run(self._resolution)
+
+
+_DISPLAY = _Display()
+
+
 def get_resolution():
-    d = display.Display().screen()
-    return (d.width_in_pixels, d.height_in_pixels)
+    return _DISPLAY.resolution()
 
 
 def get_cursor_pos():
-    d = display.Display().screen().root.query_pointer()
-    return (d.root_x, d.root_y)
+    try:
+        return _DISPLAY.cursor_pos()
+    except (error.DisplayError, error.ConnectionClosedError, error.XError, EnvironmentError):
+        return None
     
     
 class _MouseClick(HookManager):
@@ -44,7 +195,52 @@ class _MouseClick(HookManager):
 
 
 def get_mouse_click():
+    global _CLICKS
+    if _CLICKS is None:
+        _CLICKS = _MouseClick()
     return _CLICKS.return_click()
     
     
-_CLICKS = _MouseClick()
\ No newline at end of file
+_CLICKS = None
+
+
+class _InputHook(HookManager):
+    """Send key and mouse button events to an InputEvents buffer.
+    The raw X events are used, as the pyxhook events look up
+    the focused window and key name each time.
+    """
+    def __init__(self, input_events):
+        super(_InputHook, self).__init__()
+        self.daemon = True
+        self.input_events = input_events
+        self.key_names = {}
+        
+        #Ignore mouse movement as the position is read separately
+        self.contextEventMask = [X.KeyPress, X.ButtonRelease]
+        self.KeyDown = self.KeyUp = self.key_event
+        self.MouseAllButtonsDown = self.MouseAllButtonsUp = self.button_event
+
+    def keypressevent(self, event):
+        return event
+    keyreleaseevent = buttonpressevent = buttonreleaseevent = mousemoveevent = keypressevent
+
+    def key_event(self, event):
+        try:
+            key = self.key_names[event.detail]
+        except KeyError:
+            keysym = self.local_dpy.keycode_to_keysym(event.detail, 0)
+            key = self.key_names[event.detail] = _KEYSYMS.get(keysym)
+        if key is not None:
+            self.input_events.push(KEY_EVENT, key, event.type == X.KeyPress)
+
+    def button_event(self, event):
+        button = _MOUSE_BUTTONS.get(event.detail)
+        if button is not None:
+            self.input_events.push(MOUSE_EVENT, button, event.type == X.ButtonPress)
+
+
+def start_input_events():
+    input_events = InputEvents()
+    input_events.hook = _InputHook(input_events)
+    input_events.hook.start()
+    return input_events
\ No newline at end of file
@@ -84,6 +84,15 @@ def get_key_press(key):
         True/False if the selected key has been pressed or not.
     """
     return False
+
+
+def start_input_events():
+    """Start recording key and mouse button events in the background.
+    Returns:
+        InputEvents object to drain the events from each tick.
+        None if events aren't supported, and the keys need polling instead.
+    """
+    return None
     
     
 def get_documents_path():
@@ -6,24 +6,27 @@ Source: https://github.com/Peter92/MouseTracks
 
 from __future__ import division, absolute_import
 
-import time
 import traceback
 
 import core.numpy as numpy
 from core.applications import RunningApplications
 from core.compatibility import range, get_items
 from core.config import CONFIG
-from core.constants import MAX_INT, DISABLE_TRACKING, IGNORE_TRACKING, UPDATES_PER_SECOND
-from core.files import LoadData, save_data, prepare_file
-from core.maths import find_distance, calculate_line
+from core.constants import MAX_INT, IGNORE_TRACKING, UPDATES_PER_SECOND
+from core.files import LoadData
+from core.maths import find_distance
 from core.notify import *
 from core.os import MULTI_MONITOR, monitor_info, set_priority
+from core.track.batch import split_batch, FrameRun
+from core.track.save import SaveWorker
+from core.versions import map_dtype
     
 
-def running_processes(q_recv, q_send, background_send):
+def running_processes(q_recv, q_send):
     """Check for running processes.
     As refreshing the list takes some time but not CPU, this is put in its own thread
-    and sends the currently running program to the backgrund process.
+    and sends the currently running program back to the main loop.
+    The main loop passes it on to the background process in order with the other frames.
     """
     try:
         previous_app = None
@@ -97,53 +100,12 @@ def running_processes(q_recv, q_send, background_send):
                     previous_app = current_app
                 
                 if send:
-                    background_send.put(send)
                     q_send.put(send)
     
     #Catch error after KeyboardInterrupt
     except EOFError:
         return
 
-def _save_wrapper(q_send, program_name, data, new_program=False):
-    """Handle saving the data files from the thread."""
-    
-    if program_name is not None and program_name[0] == DISABLE_TRACKING:
-        return
-    
-    NOTIFY(SAVE_PREPARE)
-    NOTIFY.send(q_send)
-    saved = False
-
-    #Get how many attempts to use
-    if new_program:
-        max_attempts = CONFIG['Save']['MaximumAttemptsSwitch']
-    else:
-        max_attempts = CONFIG['Save']['MaximumAttemptsNormal']
-    
-    compressed_data = prepare_file(data)
-    
-    #Attempt to save
-    NOTIFY(SAVE_START)
-    NOTIFY.send(q_send)
-    for i in range(max_attempts):
-        if save_data(program_name, compressed_data, _compress=False):
-            NOTIFY(SAVE_SUCCESS)
-            NOTIFY.send(q_send)
-            saved = True
-            break
-        
-        else:
-            if max_attempts == 1:
-                NOTIFY(SAVE_FAIL)
-                return
-            NOTIFY(SAVE_FAIL_RETRY, CONFIG['Save']['WaitAfterFail'], i, max_attempts)
-            NOTIFY.send(q_send)
-            time.sleep(CONFIG['Save']['WaitAfterFail'])
-            
-    if not saved:
-        NOTIFY(SAVE_FAIL_END)
-
-
 def background_process(q_recv, q_send):
     """Function to handle all the data from the main thread."""
     try:
@@ -152,7 +114,7 @@ def background_process(q_recv, q_send):
         
         set_priority('low')
         
-        store = {'Data': LoadData(),
+        store = {'Data': tile_click_maps(LoadData()),
                  'LastProgram': None,
                  'Resolution': None,
                  'MonitorLimits': None,
@@ -168,6 +130,7 @@ def background_process(q_recv, q_send):
                  'FirstLoad': True,
                  'LastTrackUpdate': 0
                 }
+        save_worker = SaveWorker(q_send)
         
         NOTIFY(DATA_LOADED)
         try:
@@ -177,176 +140,172 @@ def background_process(q_recv, q_send):
         NOTIFY.send(q_send)
         
         while True:
-            received_data = q_recv.get()
+            finished = False
+            for received_data in split_batch(q_recv.get()):
+                
+                #Apply everything between any profile or resolution changes at once
+                if isinstance(received_data, FrameRun):
+                    record_frames(store, received_data)
+                    compress_tracks_if_needed(store, q_send, q_recv)
+                    continue
             
-            #Increment the amount of time the script has been running for
-            if 'Ticks' in received_data:
-                store['Data']['Ticks']['Total'] += received_data['Ticks']
+                #Increment the amount of time the script has been running for
+                if 'Ticks' in received_data:
+                    store['Data']['Ticks']['Total'] += received_data['Ticks']
             
-            #Save the data
-            if 'Save' in received_data:
-                if store['ActivitySinceLastSave']:
-                    _save_wrapper(q_send, store['LastProgram'], store['Data'], False)
-                    store['ActivitySinceLastSave'] = False
-                    store['SavesSkipped'] = 0
+                #Save the data
+                if 'Save' in received_data:
+                    if store['ActivitySinceLastSave']:
+                        save_worker.save(store['LastProgram'], store['Data'], finished=True)
+                        store['ActivitySinceLastSave'] = False
+                        store['SavesSkipped'] = 0
                     
-                    try:
-                        NOTIFY(QUEUE_SIZE, q_recv.qsize())
-                    except NotImplementedError:
-                        pass
-                else:
-                    store['SavesSkipped'] += 1
+                        try:
+                            NOTIFY(QUEUE_SIZE, q_recv.qsize())
+                        except NotImplementedError:
+                            pass
+                    else:
+                        store['SavesSkipped'] += 1
                     
-                    try:
-                        NOTIFY(SAVE_SKIP, CONFIG['Save']['Frequency'] * store['SavesSkipped'], q_recv.qsize())
-                    except NotImplementedError:
-                        pass
-                q_send.put({'SaveFinished': None})
+                        try:
+                            NOTIFY(SAVE_SKIP, CONFIG['Save']['Frequency'] * store['SavesSkipped'], q_recv.qsize())
+                        except NotImplementedError:
+                            pass
+                        q_send.put({'SaveFinished': None})
             
-            update_resolution = False
+                update_resolution = False
             
-            #Check for new program loaded
-            if 'Program' in received_data:
-                current_program = received_data['Program']
+                #Check for new program loaded
+                if 'Program' in received_data:
+                    current_program = received_data['Program']
                 
-                if current_program != store['LastProgram']:
-                    update_resolution = True
+                    if current_program != store['LastProgram']:
+                        update_resolution = True
                     
-                    if current_program is None:
-                        NOTIFY(APPLICATION_LOADING)
-                    else:
-                        NOTIFY(APPLICATION_LOADING, current_program)
-                    NOTIFY.send(q_send)
+                        if current_program is None:
+                            NOTIFY(APPLICATION_LOADING)
+                        else:
+                            NOTIFY(APPLICATION_LOADING, current_program)
+                        NOTIFY.send(q_send)
                     
-                    #Save old profile
-                    _save_wrapper(q_send, store['LastProgram'], store['Data'], True)
+                        #Save old profile
+                        save_worker.save(store['LastProgram'], store['Data'], new_program=True, _copy=False)
                     
-                    #Load new profile
-                    store['LastProgram'] = current_program
-                    store['Data'] = LoadData(current_program)
-                    store['ActivitySinceLastSave'] = False
+                        #Load new profile
+                        save_worker.wait(current_program)
+                        store['LastProgram'] = current_program
+                        store['Data'] = tile_click_maps(LoadData(current_program))
+                        store['ActivitySinceLastSave'] = False
                     
-                    #Check new resolution
-                    try:
-                        store['ApplicationResolution'] = received_data['ApplicationResolution']
-                    except AttributeError:
-                        pass
-                    if store['ApplicationResolution'] is None:
-                        check_resolution(store['Data'], store['Resolution'])
-                    else:
-                        check_resolution(store['Data'], store['ApplicationResolution'][1])
+                        #Check new resolution
+                        try:
+                            store['ApplicationResolution'] = received_data['ApplicationResolution']
+                        except AttributeError:
+                            pass
+                        if store['ApplicationResolution'] is None:
+                            check_resolution(store['Data'], store['Resolution'])
+                        else:
+                            check_resolution(store['Data'], store['ApplicationResolution'][1])
                         
-                    if store['Data']['Ticks']['Total']:
-                        NOTIFY(DATA_LOADED)
-                    else:
-                        NOTIFY(DATA_NOTFOUND)
+                        if store['Data']['Ticks']['Total']:
+                            NOTIFY(DATA_LOADED)
+                        else:
+                            NOTIFY(DATA_NOTFOUND)
                     
-                    try:
-                        NOTIFY(QUEUE_SIZE, q_recv.qsize())
-                    except NotImplementedError:
-                        pass
+                        try:
+                            NOTIFY(QUEUE_SIZE, q_recv.qsize())
+                        except NotImplementedError:
+                            pass
                         
-                NOTIFY.send(q_send)
+                    NOTIFY.send(q_send)
             
-            if 'ApplicationResolution' in received_data:
-                store['ApplicationResolution'] = received_data['ApplicationResolution']
-                if store['ApplicationResolution'] is not None:
-                    check_resolution(store['Data'], store['ApplicationResolution'][1])
-                    update_resolution = True
+                if 'ApplicationResolution' in received_data:
+                    store['ApplicationResolution'] = received_data['ApplicationResolution']
+                    if store['ApplicationResolution'] is not None:
+                        check_resolution(store['Data'], store['ApplicationResolution'][1])
+                        update_resolution = True
 
-            if 'Resolution' in received_data:
-                store['Resolution'] = received_data['Resolution']
-                check_resolution(store['Data'], received_data['Resolution'])
-                update_resolution = True
+                if 'Resolution' in received_data:
+                    store['Resolution'] = received_data['Resolution']
+                    check_resolution(store['Data'], received_data['Resolution'])
+                    update_resolution = True
             
-            if 'MonitorLimits' in received_data:
-                store['MonitorLimits'] = received_data['MonitorLimits']
-                update_resolution = True
+                if 'MonitorLimits' in received_data:
+                    store['MonitorLimits'] = received_data['MonitorLimits']
+                    update_resolution = True
             
-            #Keep the history tracking the correct resolution
-            if update_resolution and CONFIG['Main']['HistoryLength']:
-                if store['ApplicationResolution'] is not None:
-                    history_resolution = store['ApplicationResolution']
-                elif MULTI_MONITOR:
-                    history_resolution = store['MonitorLimits']
-                else:
-                    history_resolution = store['Resolution']
-                try:
-                    if store['Data']['HistoryAnimation']['Tracks'][-1][0] != history_resolution:
-                        raise IndexError
-                except IndexError:
-                    store['Data']['HistoryAnimation']['Tracks'].append([history_resolution])
+                #Keep the history tracking the correct resolution
+                if update_resolution and CONFIG['Main']['HistoryLength']:
+                    if store['ApplicationResolution'] is not None:
+                        history_resolution = store['ApplicationResolution']
+                    elif MULTI_MONITOR:
+                        history_resolution = store['MonitorLimits']
+                    else:
+                        history_resolution = store['Resolution']
+                    try:
+                        if store['Data']['HistoryAnimation']['Tracks'][-1][0] != history_resolution:
+                            raise IndexError
+                    except IndexError:
+                        store['Data']['HistoryAnimation']['Tracks'].append([history_resolution])
             
-            #Record key presses
-            if 'KeyPress' in received_data:
-                store['ActivitySinceLastSave'] = True
-                record_key_press(store, received_data['KeyPress'])
+                #Record key presses
+                if 'KeyPress' in received_data:
+                    store['ActivitySinceLastSave'] = True
+                    record_key_press(store, received_data['KeyPress'])
             
-            #Record time keys are held down
-            if 'KeyHeld' in received_data:
-                record_key_held(store, received_data['KeyHeld'])
-                store['ActivitySinceLastSave'] = True
+                #Record time keys are held down
+                if 'KeyHeld' in received_data:
+                    record_key_held(store, received_data['KeyHeld'])
+                    store['ActivitySinceLastSave'] = True
             
-            #Record button presses
-            if 'GamepadButtonPress' in received_data:
-                store['ActivitySinceLastSave'] = True
-                record_gamepad_pressed(store, received_data['GamepadButtonPress'])
+                #Record button presses
+                if 'GamepadButtonPress' in received_data:
+                    store['ActivitySinceLastSave'] = True
+                    record_gamepad_pressed(store, received_data['GamepadButtonPress'])
             
-            #Record how long buttons are held
-            if 'GamepadButtonHeld' in received_data:
-                store['ActivitySinceLastSave'] = True
-                record_gamepad_held(store, received_data['GamepadButtonHeld'])
+                #Record how long buttons are held
+                if 'GamepadButtonHeld' in received_data:
+                    store['ActivitySinceLastSave'] = True
+                    record_gamepad_held(store, received_data['GamepadButtonHeld'])
                         
-            #Axis updates
-            if 'GamepadAxis' in received_data:
-                record_gamepad_axis(store, received_data['GamepadAxis'])
+                #Axis updates
+                if 'GamepadAxis' in received_data:
+                    record_gamepad_axis(store, received_data['GamepadAxis'])
                                 
             
-            #Calculate and track mouse movement
-            if 'MouseMove' in received_data:
-                store['ActivitySinceLastSave'] = True
-                record_mouse_move(store, received_data['MouseMove'])
-                
-                #Add to history if set
-                if CONFIG['Main']['HistoryLength']:
-                    start, end = received_data['MouseMove']
-                    store['Data']['HistoryAnimation']['Tracks'][-1].append(end)
-                
-                #Compress tracks if the count gets too high
-                max_track_value = CONFIG['Advanced']['CompressTrackMax']
-                if not max_track_value:
-                    max_track_value = MAX_INT
+                #Calculate and track mouse movement
+                if 'MouseMove' in received_data:
+                    store['ActivitySinceLastSave'] = True
+                    record_mouse_move(store, received_data['MouseMove'])
                 
-                if store['Data']['Ticks']['Tracks'] > max_track_value:
-                    NOTIFY(TRACK_COMPRESS_START, 'track')
-                    NOTIFY.send(q_send)
-                    
-                    compress_tracks(store, CONFIG['Advanced']['CompressTrackAmount'])
+                    #Add to history if set
+                    if CONFIG['Main']['HistoryLength']:
+                        start, end = received_data['MouseMove']
+                        store['Data']['HistoryAnimation']['Tracks'][-1].append(end)
                     
-                    NOTIFY(TRACK_COMPRESS_END, 'track')
-                    try:
-                        NOTIFY(QUEUE_SIZE, q_recv.qsize())
-                    except NotImplementedError:
-                        pass
+                    compress_tracks_if_needed(store, q_send, q_recv)
                 
-            #Record mouse clicks
-            if 'MouseClick' in received_data:
-                store['ActivitySinceLastSave'] = True
-                record_click_single(store, received_data['MouseClick'])
+                #Record mouse clicks
+                if 'MouseClick' in received_data:
+                    store['ActivitySinceLastSave'] = True
+                    record_click_single(store, received_data['MouseClick'])
                     
-            #Record double clicks
-            if 'DoubleClick' in received_data:
-                store['ActivitySinceLastSave'] = True
-                record_click_double(store, received_data['DoubleClick'])
+                #Record double clicks
+                if 'DoubleClick' in received_data:
+                    store['ActivitySinceLastSave'] = True
+                    record_click_double(store, received_data['DoubleClick'])
             
-            #Trim the history list if too long
-            if 'HistoryCheck' in received_data and CONFIG['Main']['HistoryLength']:
-                max_length = CONFIG['Main']['HistoryLength'] * UPDATES_PER_SECOND
-                history_trim(store, max_length)
+                #Trim the history list if too long
+                if 'HistoryCheck' in received_data and CONFIG['Main']['HistoryLength']:
+                    max_length = CONFIG['Main']['HistoryLength'] * UPDATES_PER_SECOND
+                    history_trim(store, max_length)
                         
-            store['Data']['Ticks']['Recorded'] += 1
+                store['Data']['Ticks']['Recorded'] += 1
             
-            if 'Quit' in received_data or 'Exit' in received_data:
+                if 'Quit' in received_data or 'Exit' in received_data:
+                    finished = True
+                    break
+            if finished:
                 break
 
             NOTIFY.send(q_send)
@@ -354,7 +313,8 @@ def background_process(q_recv, q_send):
         #Exit process (this shouldn't happen for now)
         NOTIFY(THREAD_EXIT)
         NOTIFY.send(q_send)
-        _save_wrapper(q_send, store['LastProgram'], store['Data'], False)
+        save_worker.save(store['LastProgram'], store['Data'], _copy=False)
+        save_worker.stop()
             
     except Exception as e:
         q_send.put(traceback.format_exc())
@@ -364,29 +324,42 @@ def background_process(q_recv, q_send):
         
         
 def check_resolution(data, resolution):
-    """Make sure resolution exists in data."""
+    """Make sure resolution exists in data.
+    The click maps are tiled as they are mostly empty.
+    """
     if resolution is None:
         return
     if not isinstance(resolution, tuple):
         raise ValueError('incorrect resolution: {}'.format(resolution))
         
     if resolution not in data['Resolution']:
-        data['Resolution'][resolution] = {'Tracks': numpy.array(resolution, create=True), 
-                                          'Speed': numpy.array(resolution, create=True),
+        data['Resolution'][resolution] = {'Tracks': numpy.array(resolution, create=True, dtype=map_dtype('Track')), 
+                                          'Speed': numpy.array(resolution, create=True, dtype=map_dtype('Speed')),
                                           'Clicks': {}}
         clicks = data['Resolution'][resolution]['Clicks']
-        clicks['All'] = {'Single': {'Left': numpy.array(resolution, create=True),
-                                    'Middle': numpy.array(resolution, create=True),
-                                    'Right': numpy.array(resolution, create=True)},
-                         'Double': {'Left': numpy.array(resolution, create=True),
-                                    'Middle': numpy.array(resolution, create=True),
-                                    'Right': numpy.array(resolution, create=True)}}
-        clicks['Session'] = {'Single': {'Left': numpy.array(resolution, create=True),
-                                        'Middle': numpy.array(resolution, create=True),
-                                        'Right': numpy.array(resolution, create=True)},
-                             'Double': {'Left': numpy.array(resolution, create=True),
-                                        'Middle': numpy.array(resolution, create=True),
-                                        'Right': numpy.array(resolution, create=True)}}
+        clicks['All'] = {'Single': {'Left': numpy.array(resolution, create=True, tiled=True, dtype=map_dtype('Click')),
+                                    'Middle': numpy.array(resolution, create=True, tiled=True, dtype=map_dtype('Click')),
+                                    'Right': numpy.array(resolution, create=True, tiled=True, dtype=map_dtype('Click'))},
+                         'Double': {'Left': numpy.array(resolution, create=True, tiled=True, dtype=map_dtype('Click')),
+                                    'Middle': numpy.array(resolution, create=True, tiled=True, dtype=map_dtype('Click')),
+                                    'Right': numpy.array(resolution, create=True, tiled=True, dtype=map_dtype('Click'))}}
+        clicks['Session'] = {'Single': {'Left': numpy.array(resolution, create=True, tiled=True, dtype=map_dtype('Click')),
+                                        'Middle': numpy.array(resolution, create=True, tiled=True, dtype=map_dtype('Click')),
+                                        'Right': numpy.array(resolution, create=True, tiled=True, dtype=map_dtype('Click'))},
+                             'Double': {'Left': numpy.array(resolution, create=True, tiled=True, dtype=map_dtype('Click')),
+                                        'Middle': numpy.array(resolution, create=True, tiled=True, dtype=map_dtype('Click')),
+                                        'Right': numpy.array(resolution, create=True, tiled=True, dtype=map_dtype('Click'))}}
+
+
+def tile_click_maps(data):
+    """Convert the click maps of a loaded profile to tiles."""
+    for resolution, maps in get_items(data['Resolution']):
+        for session in maps['Clicks'].values():
+            for click_type in session.values():
+                for button, array in get_items(click_type):
+                    if not isinstance(array, numpy.TiledArray):
+                        click_type[button] = numpy.TiledArray.from_array(array)
+    return data
 
                                         
 def monitor_offset(coordinate, monitor_limits):
@@ -430,6 +403,48 @@ def get_monitor_coordinate(x, y, store):
         return ((x, y), resolution)
         
 
+def _split_by_monitor(x, y, monitor_limits, extra=()):
+    """Group arrays of coordinates by the monitor they are on.
+    Any extra arrays are grouped in the same way.
+    Returns a list of (resolution, x, y, *extra) and a mask of anything left over.
+    """
+    result = []
+    remaining = x == x
+    for x1, y1, x2, y2 in monitor_limits or ():
+        on_monitor = remaining & (x1 <= x) & (x < x2) & (y1 <= y) & (y < y2)
+        if on_monitor.any():
+            remaining &= ~on_monitor
+            result.append(((x2 - x1, y2 - y1), x[on_monitor] - x1, y[on_monitor] - y1)
+                          + tuple(array[on_monitor] for array in extra))
+    return result, remaining
+
+
+def get_monitor_coordinates(x, y, store, *extra):
+    """Array version of get_monitor_coordinate.
+    Returns a list of (resolution, x, y) for each monitor the coordinates are on.
+    Any extra arrays, such as values for each coordinate, are added to the end.
+    """
+    
+    if store['ApplicationResolution'] is not None:
+        return _split_by_monitor(x, y, [store['ApplicationResolution'][0]], extra)[0]
+    
+    elif MULTI_MONITOR:
+        result, remaining = _split_by_monitor(x, y, store['MonitorLimits'], extra)
+        
+        #Refresh the monitor list if any points are outside it
+        if remaining.any():
+            store['MonitorLimits'] = monitor_info()
+            result += _split_by_monitor(x[remaining], y[remaining], store['MonitorLimits'],
+                                        tuple(array[remaining] for array in extra))[0]
+        
+        for group in result:
+            check_resolution(store['Data'], group[0])
+        return result
+    
+    else:
+        return [(store['Resolution'], x, y) + tuple(extra)]
+        
+
 def history_trim(store, desired_length):
     """Trim the history animation to the desired length."""
     
@@ -465,8 +480,11 @@ def _record_click(store, received_data, click_type):
             continue
         
         mouse_button = ['Left', 'Middle', 'Right'][mouse_button_index]
-        store['Data']['Resolution'][resolution]['Clicks']['All'][click_type][mouse_button][y][x] += 1
-        store['Data']['Resolution'][resolution]['Clicks']['Session'][click_type][mouse_button][y][x] += 1
+        for session in ('All', 'Session'):
+            maps = store['Data']['Resolution'][resolution]['Clicks'][session][click_type]
+            maps[mouse_button] = numpy.promote(maps[mouse_button], int(maps[mouse_button][y, x]) + 1)
+            maps[mouse_button][y, x] += 1
+            store['Data'].modified(resolution, 'Clicks', session, click_type, mouse_button)
 
 
 def record_click_single(store, received_data):
@@ -477,10 +495,31 @@ def record_click_double(store, received_data):
     return _record_click(store, received_data, 'Single')
     
 
+def compress_tracks_if_needed(store, q_send, q_recv):
+    """Compress tracks if the count gets too high."""
+    max_track_value = CONFIG['Advanced']['CompressTrackMax']
+    if not max_track_value:
+        max_track_value = MAX_INT
+
+    if store['Data']['Ticks']['Tracks'] > max_track_value:
+        NOTIFY(TRACK_COMPRESS_START, 'track')
+        NOTIFY.send(q_send)
+    
+        compress_tracks(store, CONFIG['Advanced']['CompressTrackAmount'])
+    
+        NOTIFY(TRACK_COMPRESS_END, 'track')
+        try:
+            NOTIFY(QUEUE_SIZE, q_recv.qsize())
+        except NotImplementedError:
+            pass
+    
+
 def compress_tracks(store, multiplier):
     
     for resolution, maps in get_items(store['Data']['Resolution']):
-        maps['Tracks'] = numpy.divide(maps['Tracks'], multiplier, as_int=True)
+        #Divide in place to keep the data type, as the multiplier may be a float
+        maps['Tracks'][...] = maps['Tracks'] // multiplier
+        store['Data'].modified(resolution, 'Tracks')
             
     store['Data']['Ticks']['Tracks'] //= multiplier
     store['Data']['Ticks']['Tracks'] = int(store['Data']['Ticks']['Tracks'])
@@ -555,7 +594,12 @@ def _record_keypress(key_dict, *args):
         session[args[-1]] = 1
         
         
-def record_key_press(store, received_data):
+def record_key_press(store, received_data, ticks=None):
+    """Record a list of key presses.
+    Set ticks to the total ticks when the keys were pressed, if not the current total.
+    """
+    if ticks is None:
+        ticks = store['Data']['Ticks']['Total']
     for key in received_data:
     
         _record_keypress(store['Data']['Keys'], 'Pressed', key)
@@ -574,12 +618,12 @@ def record_key_press(store, received_data):
         
         #Record interval between key presses
         if store['KeyTrack']['Time'] is not None:
-            time_difference = store['Data']['Ticks']['Total'] - store['KeyTrack']['Time']
+            time_difference = ticks - store['KeyTrack']['Time']
             _record_keypress(store['Data']['Keys'], 'Intervals', 'Total', time_difference)
             _record_keypress(store['Data']['Keys'], 'Intervals', 'Individual', store['KeyTrack']['LastKey'], key, time_difference)
         
         store['KeyTrack']['LastKey'] = key
-        store['KeyTrack']['Time'] = store['Data']['Ticks']['Total']
+        store['KeyTrack']['Time'] = ticks
         
 
 def record_key_held(store, received_data):
@@ -588,57 +632,126 @@ def record_key_held(store, received_data):
         
         
 def record_mouse_move(store, received_data):
+    """Record a single (start, end) mouse movement."""
+    record_mouse_moves(store, [(store['Data']['Ticks']['Total'],) + tuple(received_data)])
+
 
+def record_mouse_moves(store, moves):
+    """Record a list of (total_ticks, start, end) mouse movements.
+    The pixels of every line are calculated and written together,
+    with the same result as recording each movement in order.
+    """
+    if not moves:
+        return
     store['ActivitySinceLastSave'] = True
-    resolution = 0
-    _resolution = -1
+    data = store['Data']
     
-    start, end = received_data
+    #Make sure resolution exists in data
+    if store['ApplicationResolution'] is not None:
+        check_resolution(data, store['ApplicationResolution'][1])
     
-    #Store total distance travelled
-    distance = find_distance(end, start)
-    store['Data']['Distance']['Tracks'] += distance
+    lines = []
+    line_index = []
+    distances = []
+    continuous = []
+    for i, (total_ticks, start, end) in enumerate(moves):
     
-    #Calculate the pixels in the line
-    if start is None:
-        mouse_coordinates = [end]
-    else:
-        mouse_coordinates = [start] + calculate_line(start, end) + [end]
+        #Store total distance travelled
+        distance = find_distance(end, start)
+        data['Distance']['Tracks'] += distance
+        distances.append(distance)
         
-    #Make sure resolution exists in data
-    if store['ApplicationResolution'] is not None:
-        check_resolution(store['Data'], store['ApplicationResolution'][1])
+        #Find if part of continous mouse move
+        continuous.append(store['LastTrackUpdate'] + 1 == total_ticks)
+        store['LastTrackUpdate'] = total_ticks
         
-    elif MULTI_MONITOR:
-        try:
-            #Don't bother calculating offset for each pixel
-            #if both start and end are on the same monitor
-            resolution, (x_offset, y_offset) = monitor_offset(start, store['MonitorLimits'])
-            _resolution = monitor_offset(end, store['MonitorLimits'])[0]
-        except TypeError:
-            if not resolution:
-                mouse_coordinates = []
-        else:
-            check_resolution(store['Data'], resolution)
-            if resolution != _resolution:
-                check_resolution(store['Data'], resolution)
-            _resolutions = [resolution, _resolution]
+        #Ignore the movement if it starts outside every monitor
+        if store['ApplicationResolution'] is None and MULTI_MONITOR:
+            try:
+                resolution = monitor_offset(start, store['MonitorLimits'])[0]
+            except TypeError:
+                continue
+            check_resolution(data, resolution)
+            
+        #A single point is treated as a line to itself
+        lines.append((end if start is None else start, end))
+        line_index.append(i)
     
-    #Find if part of continous mouse move
-    continous = store['LastTrackUpdate'] + 1 == store['Data']['Ticks']['Total']
+    #Calculate the pixels of every line, already in the same order as the moves
+    x, y, segment = numpy.calculate_lines(lines, include_ends=True)
+    move = numpy.array(line_index, dtype='int64')[segment]
     
-    #Write each pixel to the dictionary
-    for (x, y) in mouse_coordinates:
+    #Each move is given the next track value
+    #As this is always higher than the existing values, the order they are written in doesn't matter
+    track_values = data['Ticks']['Tracks'] + move
+    speed_values = numpy.array(distances)[move]
+    speed_mask = numpy.array(continuous, dtype=bool)[move]
     
-        try:
-            (x, y), resolution = get_monitor_coordinate(x, y, store)
-        except TypeError:
-            continue
-            
-        store['Data']['Resolution'][resolution]['Tracks'][y][x] = store['Data']['Ticks']['Tracks']
-        if continous:
-            old_value = store['Data']['Resolution'][resolution]['Speed'][y][x]
-            store['Data']['Resolution'][resolution]['Speed'][y][x] = max(distance, old_value)
+    #Write all the pixels to the arrays at once
+    for resolution, _x, _y, _tracks, _speed, _mask in get_monitor_coordinates(x, y, store, track_values, speed_values, speed_mask):
+        maps = data['Resolution'][resolution]
+        maps['Tracks'] = numpy.promote(maps['Tracks'], numpy.max(_tracks))
+        numpy.scatter_max(maps['Tracks'], _y, _x, _tracks)
+        data.modified(resolution, 'Tracks')
+        if _mask.any():
+            maps['Speed'] = numpy.promote(maps['Speed'], numpy.max(_speed[_mask]))
+            numpy.scatter_max(maps['Speed'], _y[_mask], _x[_mask], _speed[_mask])
+            data.modified(resolution, 'Speed')
+    
+    data['Ticks']['Tracks'] += len(moves)
+
+
+def record_frames(store, frame_run):
+    """Apply a FrameRun in one pass.
+    Nothing in the run can change the profile or resolution,
+    so it gives the same result as applying each frame in order.
+    """
+    data = store['Data']
+    
+    #Get the total ticks at each frame
+    frame_ticks = []
+    total_ticks = data['Ticks']['Total']
+    for ticks in frame_run.ticks:
+        total_ticks += ticks
+        frame_ticks.append(total_ticks)
+    
+    #Keys not in the batch index are stored with the other values
+    key_press = list(frame_run.key_press)
+    key_held = list(frame_run.key_held)
+    for frame, key, value in frame_run.other:
+        if key == 'KeyPress':
+            key_press += [(frame, k) for k in value]
+        elif key == 'KeyHeld':
+            key_held += [(frame, k) for k in value]
+    key_press.sort(key=lambda item: item[0])
+    
+    for frame, key in key_press:
+        record_key_press(store, [key], frame_ticks[frame])
+    if key_held:
+        record_key_held(store, [key for frame, key in key_held])
+    if key_press or key_held:
+        store['ActivitySinceLastSave'] = True
+    
+    for frame, key, value in frame_run.other:
+        if key == 'GamepadButtonPress':
+            store['ActivitySinceLastSave'] = True
+            record_gamepad_pressed(store, value)
+        elif key == 'GamepadButtonHeld':
+            store['ActivitySinceLastSave'] = True
+            record_gamepad_held(store, value)
+        elif key == 'GamepadAxis':
+            record_gamepad_axis(store, value)
+        elif key == 'MouseClick':
+            store['ActivitySinceLastSave'] = True
+            record_click_single(store, value)
+        elif key == 'DoubleClick':
+            store['ActivitySinceLastSave'] = True
+            record_click_double(store, value)
+    
+    if frame_run.mouse_move:
+        record_mouse_moves(store, [(frame_ticks[frame], start, end) for frame, start, end in frame_run.mouse_move])
+        if CONFIG['Main']['HistoryLength']:
+            data['HistoryAnimation']['Tracks'][-1].extend(end for frame, start, end in frame_run.mouse_move)
     
-    store['LastTrackUpdate'] = store['Data']['Ticks']['Total']
-    store['Data']['Ticks']['Tracks'] += 1
\ No newline at end of file
+    data['Ticks']['Total'] = total_ticks
+    data['Ticks']['Recorded'] += len(frame_run)
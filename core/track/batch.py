@@ -0,0 +1,178 @@
+"""
+This is part of the Mouse Tracks Python application.
+Source: https://github.com/Peter92/MouseTracks
+"""
+#Group frames together so the background process isn't sent one message per tick
+
+from __future__ import absolute_import
+
+import time
+
+import core.numpy as numpy
+from core.compatibility import get_items, range
+from core.os import KEYS
+
+
+KEY_NAMES = sorted(KEYS)
+
+KEY_INDEXES = {k: i for i, k in enumerate(KEY_NAMES)}
+
+#Anything here will send the batch straight away
+FLUSH_KEYS = ('Save', 'Quit', 'Exit', 'Program', 'ApplicationResolution')
+
+#Anything here may change the profile, resolution or history, so is applied one frame at a time
+CONTROL_KEYS = ('Save', 'Program', 'ApplicationResolution', 'Resolution', 'MonitorLimits', 'HistoryCheck', 'Quit', 'Exit')
+
+
+class FrameBatch(object):
+    """Collect frames and pack them into a single columnar message.
+
+    Mouse movements and key presses are stored as arrays,
+    and anything else is kept as a list of (frame, key, value).
+    """
+    def __init__(self, max_frames=1, max_time=0):
+        self.max_frames = max(1, max_frames)
+        self.max_time = max_time / 1000
+        self.reset()
+
+    def __len__(self):
+        return len(self.frames)
+
+    def reset(self):
+        self.frames = []
+        self.time = time.time()
+
+    def add(self, frame):
+        """Add a frame to the batch.
+        Returns True if the batch is ready to send.
+        """
+        if not self.frames:
+            self.time = time.time()
+        self.frames.append(frame)
+        for key in FLUSH_KEYS:
+            if key in frame:
+                return True
+        return self.ready()
+
+    def ready(self):
+        """Check if the batch is full or has waited long enough."""
+        if not self.frames:
+            return False
+        return len(self.frames) >= self.max_frames or time.time() - self.time >= self.max_time
+
+    def pack(self):
+        """Convert the frames into one message and reset the batch."""
+        frames = self.frames
+        self.reset()
+
+        ticks = []
+        move_frame = []
+        move_start = []
+        move_end = []
+        key_frame = {'KeyPress': [], 'KeyHeld': []}
+        key_id = {'KeyPress': [], 'KeyHeld': []}
+        other = []
+        for i, frame in enumerate(frames):
+            for key, value in get_items(frame):
+                if key == 'Ticks':
+                    continue
+
+                elif key == 'MouseMove':
+                    start, end = value
+                    move_frame.append(i)
+                    move_start.append((0, 0, 0) if start is None else (1, start[0], start[1]))
+                    move_end.append(end)
+
+                elif key in key_id and all(k in KEY_INDEXES for k in value):
+                    key_frame[key] += [i] * len(value)
+                    key_id[key] += [KEY_INDEXES[k] for k in value]
+
+                else:
+                    other.append((i, key, value))
+            ticks.append(frame.get('Ticks', 0))
+
+        batch = {'Frames': len(frames),
+                 'Ticks': numpy.array(ticks, dtype='int64'),
+                 'MouseMove': {'Frame': numpy.array(move_frame, dtype='int64'),
+                               'Start': numpy.array(move_start, dtype='int64'),
+                               'End': numpy.array(move_end, dtype='int64')},
+                 'Other': other}
+        for key in key_id:
+            batch[key] = {'Frame': numpy.array(key_frame[key], dtype='int64'),
+                          'Key': numpy.array(key_id[key], dtype='int16')}
+        return {'Batch': batch}
+
+
+class FrameRun(object):
+    """A run of frames that can be applied together.
+
+    Ticks is the number of ticks before each frame.
+    MouseMove is a list of (frame, start, end),
+    KeyPress and KeyHeld are lists of (frame, key),
+    and Other is a list of (frame, key, value), all in frame order.
+    """
+    def __init__(self, ticks, mouse_move, key_press, key_held, other):
+        self.ticks = ticks
+        self.mouse_move = mouse_move
+        self.key_press = key_press
+        self.key_held = key_held
+        self.other = other
+
+    def __len__(self):
+        return len(self.ticks)
+
+
+def _frame_range(items, start, end):
+    """Get the items between two frames, with the frame relative to the start."""
+    return [(item[0] - start,) + tuple(item[1:]) for item in items if start <= item[0] < end]
+
+
+def split_batch(received_data):
+    """Split a batch into runs of frames that can be applied at once.
+    
+    Any frame containing one of CONTROL_KEYS is returned as a normal frame,
+    and the frames between them are returned as a FrameRun.
+    A normal message will be returned as a list of one frame.
+    """
+    try:
+        batch = received_data['Batch']
+    except (KeyError, TypeError):
+        return [received_data]
+
+    ticks = batch['Ticks'].tolist()
+    moves = batch['MouseMove']
+    mouse_move = [(i, (x1, y1) if has_start else None, tuple(end))
+                  for i, (has_start, x1, y1), end in zip(moves['Frame'].tolist(), moves['Start'].tolist(), moves['End'].tolist())]
+    keys = {key: [(i, KEY_NAMES[key_id]) for i, key_id in zip(batch[key]['Frame'].tolist(), batch[key]['Key'].tolist())]
+            for key in ('KeyPress', 'KeyHeld')}
+    other = batch['Other']
+
+    result = []
+    start = 0
+    control_frames = sorted(set(i for i, key, value in other if key in CONTROL_KEYS))
+    for end in control_frames + [batch['Frames']]:
+        if end > start:
+            result.append(FrameRun(ticks[start:end],
+                                   _frame_range(mouse_move, start, end),
+                                   _frame_range(keys['KeyPress'], start, end),
+                                   _frame_range(keys['KeyHeld'], start, end),
+                                   _frame_range(other, start, end)))
+        if end == batch['Frames']:
+            break
+        
+        #Build the control frame as a normal dictionary
+        frame = {}
+        if ticks[end]:
+            frame['Ticks'] = ticks[end]
+        for i, start_point, end_point in _frame_range(mouse_move, end, end + 1):
+            frame['MouseMove'] = (start_point, end_point)
+        for key in ('KeyPress', 'KeyHeld'):
+            pressed = [k for i, k in _frame_range(keys[key], end, end + 1)]
+            if pressed:
+                frame[key] = pressed
+        for i, key, value in _frame_range(other, end, end + 1):
+            frame[key] = value
+        result.append(frame)
+        start = end + 1
+
+    return result
@@ -8,6 +8,7 @@ from __future__ import division, absolute_import
 
 import time
 import traceback
+from bisect import bisect
 from multiprocessing import Process, Queue
 from threading import Thread
 
@@ -19,9 +20,10 @@ from core.error import handle_error
 from core.files import Lock
 from core.messages import time_format
 from core.notify import *
-from core.os import monitor_info, get_cursor_pos, get_mouse_click, get_key_press, KEYS, MULTI_MONITOR, get_double_click_time
+from core.os import monitor_info, get_cursor_pos, get_mouse_click, get_key_press, KEYS, MULTI_MONITOR, get_double_click_time, start_input_events
 from core.sockets import get_free_port
 from core.track.background import background_process, running_processes, monitor_offset
+from core.track.batch import FrameBatch
 from core.track.xinput import Gamepad
 
 
@@ -29,20 +31,61 @@ class RefreshRateLimiter(object):
     """Limit the loop to a fixed updates per second.
     It works by detecting how long a frame should be,
     and comparing it to how long it's already taken.
+    
+    If timing is given, the jitter and overrun of the frame will be recorded.
     """
-    def __init__(self, ticks):
+    def __init__(self, ticks, timing=None):
         self.time = time.time()
         self.frame_time = 1 / ticks
+        self.timing = timing
 
     def __enter__(self):
         return self
 
     def __exit__(self, *args):
         time_difference = time.time() - self.time
+        sleep_time = max(0, self.frame_time - time_difference)
         try:
-            time.sleep(max(0, self.frame_time - time_difference))
+            time.sleep(sleep_time)
         except IOError: #Interrupted function call (when quitting program)
             pass
+        if self.timing is not None:
+            jitter = time.time() - self.time - time_difference - sleep_time
+            self.timing.record(jitter, time_difference - self.frame_time)
+
+
+class TickTiming(object):
+    """Count how late each tick finishes, grouped by milliseconds.
+    Jitter is how much longer than requested the sleep took,
+    and overrun is how much longer than a frame the work took.
+    """
+    BINS = (0.5, 1, 2, 5, 10, 20, 50, 100)
+
+    def __init__(self):
+        self.jitter = [0] * (len(self.BINS) + 1)
+        self.overrun = [0] * (len(self.BINS) + 1)
+        self.frames = 0
+        self.idle_frames = 0
+    
+    def record(self, jitter, overrun):
+        self.jitter[bisect(self.BINS, jitter * 1000)] += 1
+        self.overrun[bisect(self.BINS, overrun * 1000)] += 1
+        self.frames += 1
+    
+    def histogram(self):
+        """Get the counts as a dictionary."""
+        labels = ['<{}ms'.format(ms) for ms in self.BINS] + ['>={}ms'.format(self.BINS[-1])]
+        return {'Frames': self.frames,
+                'IdleFrames': self.idle_frames,
+                'Jitter': dict(zip(labels, self.jitter)),
+                'Overrun': dict(zip(labels, self.overrun))}
+
+
+def tick_passed(ticks, tick_step, interval):
+    """Check if a multiple of the interval was reached in the last step.
+    This is the same as checking the modulo when the step is 1.
+    """
+    return bool(interval) and ticks // interval != (ticks - tick_step) // interval
 
 
 class PrintFormat(object):
@@ -96,6 +139,7 @@ def _start_tracking():
             app.config.update(create_pipe('PORT', duplex=False))
             app.config.update(create_pipe('CONFIG', duplex=False))
             app.config.update(create_pipe('CONFIG_UPDATE', duplex=False))
+            app.config.update(create_pipe('TIMING', duplex=False))
             web_port = get_free_port()
             web_port = 65043
             local_web_server(app=app, port=web_port, q_feedback=q_feedback)
@@ -115,6 +159,7 @@ def _start_tracking():
                  'ReloadProgramList': CONFIG['Advanced']['ReloadApplicationList'],
                  'UpdateQueuedCommands': CONFIG['Advanced']['ShowQueuedCommands'],
                  'RefreshGamepads': CONFIG['Advanced']['RefreshGamepads'],
+                 'Idle': CONFIG['Advanced']['IdleTime'] * UPDATES_PER_SECOND,
                  'HistoryCheck': CONFIG['Advanced']['HistoryCheck']}
                  
         store = {'Resolution': {'Current': monitor_info(),
@@ -142,6 +187,9 @@ def _start_tracking():
                 }
         mouse_pos = store['Mouse']['Position']
         
+        #Group frames together before sending to the background process
+        frame_batch = FrameBatch(CONFIG['Advanced']['BatchFrames'], CONFIG['Advanced']['BatchTime'])
+        
         #Start background processes
         q_bg_recv = Queue()
         q_bg_send = Queue()
@@ -151,16 +199,33 @@ def _start_tracking():
         
         q_rp_recv = Queue()
         q_rp_send = Queue()
-        _running_programs = Thread(target=running_processes, args=(q_rp_send, q_rp_recv, q_bg_send))
+        _running_programs = Thread(target=running_processes, args=(q_rp_send, q_rp_recv))
         _running_programs.daemon = True
         _running_programs.start()
         
+        #Read key and mouse button events instead of polling if possible
+        input_events = start_input_events() if CONFIG['Advanced']['EventInput'] else None
+        
+        #Slow down the loop when idle, but keep counting ticks at the normal rate
+        idle_step = max(1, int(UPDATES_PER_SECOND // (CONFIG['Advanced']['IdleUpdatesPerSecond'] or UPDATES_PER_SECOND)))
+        tick_timing = TickTiming()
+        tick_step = previous_step = 1
+        
         ticks = 0
         NOTIFY(START_MAIN)
         message(NOTIFY.get_output())
         script_status = STATUS_RUNNING
         while script_status != STATUS_TERMINATED:
-            with RefreshRateLimiter(UPDATES_PER_SECOND) as limiter:
+            
+            #Double the length of each tick while idle, and reset on any activity
+            #This is only done when reading input events, as polling would miss any keys or clicks
+            if input_events is not None and timer['Idle'] and ticks - store['LastActivity'] > timer['Idle']:
+                tick_step = min(idle_step, tick_step * 2)
+                tick_timing.idle_frames += 1
+            else:
+                tick_step = 1
+            
+            with RefreshRateLimiter(UPDATES_PER_SECOND / tick_step, tick_timing) as limiter:
                 
                 #Handle web server API requests
                 if store['Flask']['App'] is not None:
@@ -189,6 +254,8 @@ def _start_tracking():
                                                                                  'web': store['Flask']['Port']['Web']})
                         elif request_id == FEEDBACK_CONFIG:
                             store['Flask']['App'].config['PIPE_CONFIG_SEND'].send(CONFIG)
+                        elif request_id == FEEDBACK_TIMING:
+                            store['Flask']['App'].config['PIPE_TIMING_SEND'].send(tick_timing.histogram())
                     
                 if script_status != STATUS_RUNNING:
                     continue
@@ -200,13 +267,18 @@ def _start_tracking():
                         if frame_data:
                             if last_sent:
                                 frame_data['Ticks'] = last_sent
-                            q_bg_send.put(frame_data)
+                            if frame_batch.add(frame_data):
+                                q_bg_send.put(frame_batch.pack())
                         if frame_data_rp:
                             q_rp_send.put(frame_data_rp)
                         store['LastSent'] = ticks
                 except NameError:
                     pass
                 
+                #Send any waiting frames if nothing else has been added
+                if frame_batch.ready():
+                    q_bg_send.put(frame_batch.pack())
+                
                 #Get messages from running program thread
                 while not q_rp_recv.empty():
                     received = q_rp_recv.get()
@@ -220,6 +292,10 @@ def _start_tracking():
                         if 'Program' in received:
                             store['Keyboard']['KeysInvalid'] |= set([k for k, v in get_items(store['Keyboard']['KeysPressed']) if v])
                         
+                        #Send through the batch so it stays in order with the frames
+                        if frame_batch.add(received):
+                            q_bg_send.put(frame_batch.pack())
+                        
                 
                 #Print any messages from previous loop
                 notify_extra = ''
@@ -308,9 +384,15 @@ def _start_tracking():
                         store['LastActivity'] = ticks
 
                         
+                #Get the input since the last tick
+                if input_events is None:
+                    mouse_clicks = get_mouse_click()
+                else:
+                    keys_down, mouse_clicks = input_events.drain()
+                
                 #Mouse clicks
                 click_repeat = CONFIG['Advanced']['RepeatClicks']
-                for mouse_button, clicked in enumerate(get_mouse_click()):
+                for mouse_button, clicked in enumerate(mouse_clicks):
 
                     mb_clicked = store['Mouse']['Clicked'].get(mouse_button, False)
                     mb_data = (mouse_button, mouse_pos['Current'])
@@ -384,8 +466,14 @@ def _start_tracking():
                 _keys_held = []
                 _keys_pressed = []
                 _keys_released = []
-                for k in KEYS:
-                    if get_key_press(KEYS[k]):
+                
+                #Only check keys that are down or were down last tick
+                if input_events is None:
+                    keys_to_check = KEYS
+                else:
+                    keys_to_check = keys_down | set(k for k, v in get_items(key_status) if v)
+                for k in keys_to_check:
+                    if get_key_press(KEYS[k]) if input_events is None else k in keys_down:
                         
                         #Ignore if held down from last profile
                         if k in key_invalid:
@@ -438,7 +526,7 @@ def _start_tracking():
                 
                 if CONFIG['Main']['_TrackGamepads']:
                     #Reload list of gamepads (in case one was plugged in)
-                    if timer['RefreshGamepads'] and not ticks % timer['RefreshGamepads']:
+                    if timer['RefreshGamepads'] and tick_passed(ticks, previous_step, timer['RefreshGamepads']):
                         try:
                             old_gamepads = set(gamepads)
                         except UnboundLocalError:
@@ -551,7 +639,7 @@ def _start_tracking():
                 
                 #Resolution
                 recalculate_mouse = False
-                check_resolution = timer['UpdateScreen'] and not ticks % timer['UpdateScreen']
+                check_resolution = timer['UpdateScreen'] and tick_passed(ticks, previous_step, timer['UpdateScreen'])
                 
                 #Check if resolution has changed
                 if check_resolution:
@@ -609,19 +697,19 @@ def _start_tracking():
                 
                 
                 #Send request to check history list
-                if timer['HistoryCheck'] and not ticks % timer['HistoryCheck']:
+                if timer['HistoryCheck'] and tick_passed(ticks, previous_step, timer['HistoryCheck']):
                     frame_data['HistoryCheck'] = True
                             
                 #Send request to update programs
-                if timer['UpdatePrograms'] and not ticks % timer['UpdatePrograms']:
+                if timer['UpdatePrograms'] and tick_passed(ticks, previous_step, timer['UpdatePrograms']):
                     frame_data_rp['Update'] = True
                 
                 #Send request to reload program list
-                if timer['ReloadProgramList'] and not ticks % timer['ReloadProgramList']:
+                if timer['ReloadProgramList'] and tick_passed(ticks, previous_step, timer['ReloadProgramList']):
                     frame_data_rp['Reload'] = True
 
                 #Update user about the queue size
-                if (timer['UpdateQueuedCommands'] and not ticks % timer['UpdateQueuedCommands'] 
+                if (timer['UpdateQueuedCommands'] and tick_passed(ticks, previous_step, timer['UpdateQueuedCommands']) 
                         and timer['Save'] and store['LastActivity'] > ticks - timer['Save']):
                     try:
                         NOTIFY(QUEUE_SIZE, q_bg_send.qsize())
@@ -629,7 +717,7 @@ def _start_tracking():
                         pass
                 
                 #Send save request
-                if store['Save']['Finished'] and ticks and not ticks % store['Save']['Next']:
+                if store['Save']['Finished'] and ticks and tick_passed(ticks, previous_step, store['Save']['Next']):
                     frame_data['Save'] = True
                     store['Save']['Finished'] = False
 
@@ -637,11 +725,14 @@ def _start_tracking():
                     mouse_pos['Previous'] = None
                 else:
                     mouse_pos['Previous'] = mouse_pos['Current']
-                ticks += 1
+                ticks += tick_step
+                previous_step = tick_step
             
     except Exception as e:
         if _background_process is not None:
             try:
+                if frame_batch:
+                    q_bg_send.put(frame_batch.pack())
                 q_bg_send.put({'Quit': True})
             except IOError:
                 pass
@@ -650,6 +741,8 @@ def _start_tracking():
     except KeyboardInterrupt:
         if _background_process is not None:
             try:
+                if frame_batch:
+                    q_bg_send.put(frame_batch.pack())
                 q_bg_send.put({'Quit': True})
             except IOError:
                 pass
@@ -0,0 +1,213 @@
+"""
+This is part of the Mouse Tracks Python application.
+Source: https://github.com/Peter92/MouseTracks
+"""
+#Save profiles in a separate thread so that tracking isn't paused
+
+from __future__ import absolute_import
+
+import copy
+import time
+import traceback
+from threading import Thread, Condition
+
+from core.compatibility import range
+from core.config import CONFIG
+from core.constants import DISABLE_TRACKING
+from core.files import save_data, prepare_file
+from core.notify import *
+from core.versions import IterateMaps
+
+
+def _save_wrapper(q_send, program_name, data, new_program=False, cache=None, notify=NOTIFY):
+    """Handle saving the data files from the thread.
+    A separate Notify instance can be given if not running in the main thread.
+    """
+    
+    if program_name is not None and program_name[0] == DISABLE_TRACKING:
+        return
+    
+    notify(SAVE_PREPARE)
+    notify.send(q_send)
+    saved = False
+
+    #Get how many attempts to use
+    if new_program:
+        max_attempts = CONFIG['Save']['MaximumAttemptsSwitch']
+    else:
+        max_attempts = CONFIG['Save']['MaximumAttemptsNormal']
+    
+    compressed_data = prepare_file(data, cache=cache)
+    
+    #Attempt to save
+    notify(SAVE_START)
+    notify.send(q_send)
+    for i in range(max_attempts):
+        if save_data(program_name, compressed_data, _compress=False):
+            notify(SAVE_SUCCESS)
+            notify.send(q_send)
+            saved = True
+            break
+        
+        else:
+            if max_attempts == 1:
+                notify(SAVE_FAIL)
+                return
+            notify(SAVE_FAIL_RETRY, CONFIG['Save']['WaitAfterFail'], i, max_attempts)
+            notify.send(q_send)
+            time.sleep(CONFIG['Save']['WaitAfterFail'])
+            
+    if not saved:
+        notify(SAVE_FAIL_END)
+
+
+class SaveWorker(object):
+    """Save profiles in a background thread.
+    
+    A copy of the data is taken when the save is requested, so that
+    tracking can carry on updating the original while it is written.
+    If the same profile is requested again before its save has started,
+    only the newest copy is kept.
+    
+    The compressed maps of each profile are kept between saves,
+    so that only the maps modified since the last save are copied
+    and compressed again.
+    """
+    def __init__(self, q_send):
+        self.q_send = q_send
+        self._notify = Notify()
+        self._pending = []
+        self._saving = None
+        self._cache = {}
+        self._running = True
+        self._condition = Condition()
+        self._thread = Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+    
+    def save(self, program_name, data, new_program=False, finished=False, _copy=True):
+        """Queue a copy of the data to be saved.
+        If finished is set, a SaveFinished message is sent once it is complete.
+        Set _copy to False if the data will not be modified again.
+        """
+        if program_name is not None and program_name[0] == DISABLE_TRACKING:
+            if finished:
+                self.q_send.put({'SaveFinished': None})
+            return
+        
+        with self._condition:
+            data, cache = self._snapshot(program_name, data, _copy)
+            for item in self._pending:
+                if item[0] == program_name:
+                    item[1] = data
+                    item[2] = item[2] or new_program
+                    item[3] = item[3] or finished
+                    item[4] = cache
+                    break
+            else:
+                self._pending.append([program_name, data, new_program, finished, cache])
+            self._condition.notify_all()
+    
+    def wait(self, program_name):
+        """Wait until a profile has no queued saves, so it can be loaded again."""
+        with self._condition:
+            while self._saving == program_name or any(item[0] == program_name for item in self._pending):
+                self._condition.wait()
+    
+    def stop(self):
+        """Wait for any queued saves to finish, then end the thread."""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._thread.join()
+    
+    def _get_cache(self, program_name, data):
+        """Get the compressed maps from the last save of the same loaded data."""
+        token = getattr(data, 'map_token', None)
+        if token is None:
+            return None
+        try:
+            cached_token, cache = self._cache[program_name]
+            if cached_token != token:
+                raise KeyError(program_name)
+        except KeyError:
+            cache = {}
+            self._cache[program_name] = (token, cache)
+        return cache
+    
+    def _snapshot(self, program_name, data, _copy=True):
+        """Copy the data, along with the compressed maps that are still up to date.
+        Any map with a compressed version is shared with the original instead of copied,
+        as it will not be read again.
+        The first save after loading a profile will copy every map.
+        """
+        cache = self._get_cache(program_name, data)
+        if cache is None:
+            return (copy.deepcopy(data) if _copy else data), None
+        
+        map_versions = getattr(data, 'map_versions', {})
+        iterate_maps = IterateMaps(data['Resolution'])
+        numpy_maps = iterate_maps.separate()
+        
+        #Take the compressed maps now, as the cache may change before the save starts
+        snapshot_cache = {}
+        snapshot_maps = []
+        for path, array in zip(iterate_maps.paths, numpy_maps):
+            version = map_versions.get(path, 0)
+            try:
+                cached = cache[path]
+            except KeyError:
+                cached = None
+            if cached is not None and cached[0] == version:
+                snapshot_cache[path] = cached
+            elif _copy:
+                array = array.copy()
+            snapshot_maps.append(array)
+        
+        try:
+            snapshot = copy.deepcopy(data) if _copy else data
+        finally:
+            iterate_maps.join(numpy_maps)
+        if _copy:
+            IterateMaps(snapshot['Resolution']).join(snapshot_maps)
+        return snapshot, snapshot_cache
+    
+    def _update_cache(self, program_name, data, snapshot_cache):
+        """Store any newly compressed maps, unless a newer version is already stored."""
+        cache = self._get_cache(program_name, data)
+        if cache is None or snapshot_cache is None:
+            return
+        for path, (version, compressed_map) in snapshot_cache.items():
+            if path not in cache or cache[path][0] < version:
+                cache[path] = (version, compressed_map)
+        
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and not self._pending:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                program_name, data, new_program, finished, cache = self._pending.pop(0)
+                self._saving = program_name
+            
+            try:
+                _save_wrapper(self.q_send, program_name, data, new_program, cache, self._notify)
+                
+                with self._condition:
+                    #The profile will be reloaded next time, so the cache can't be used again
+                    if new_program:
+                        self._cache.pop(program_name, None)
+                    else:
+                        self._update_cache(program_name, data, cache)
+            
+            except Exception:
+                self.q_send.put(traceback.format_exc())
+            
+            finally:
+                self._notify.send(self.q_send)
+                if finished:
+                    self.q_send.put({'SaveFinished': None})
+                with self._condition:
+                    self._saving = None
+                    self._condition.notify_all()
@@ -9,9 +9,10 @@ import time
 
 import core.numpy as numpy
 from core.compatibility import get_items, unicode
+from core.config import CONFIG
 
 
-FILE_VERSION = 28
+FILE_VERSION = 31
 
 VERSION = '1.0 beta'
 
@@ -20,22 +21,24 @@ class IterateMaps(object):
     def __init__(self, maps):
         self.maps = maps
         
-    def _iterate(self, maps, command, extra=None, _legacy=False):            
+    def _iterate(self, maps, command, extra=None, _legacy=False, _path=()):            
         for key, value in get_items(maps):
+            path = _path + (key,)
             
             #Old format where resolution was separate for each map
             if _legacy and isinstance(key, (str, unicode)):
-                self._iterate(value, command, extra, _legacy=_legacy)
+                self._iterate(value, command, extra, _legacy=_legacy, _path=path)
             
             #New format when each resolution contains all the maps
             elif not _legacy and isinstance(value, dict):
-                self._iterate(value, command, extra, _legacy=_legacy)
+                self._iterate(value, command, extra, _legacy=_legacy, _path=path)
 
             #Separate the numpy arrays from the data
             elif command == 'separate':
                 array = maps[key]
                 maps[key] = len(self._map_list)
                 self._map_list.append(array)
+                self.paths.append(path)
             
             #Rejoin the numpy arrays with the data
             elif command == 'join':
@@ -50,8 +53,11 @@ class IterateMaps(object):
                 maps[key] = numpy_array
                 
     def separate(self):
-        """Separate the numpy maps from the main data, and replace with an integer."""
+        """Separate the numpy maps from the main data, and replace with an integer.
+        The key path to each map is stored in self.paths.
+        """
         self._map_list = []
+        self.paths = []
         self._iterate(self.maps, 'separate')
         return self._map_list
 
@@ -64,6 +70,13 @@ class IterateMaps(object):
         self._iterate(self.maps, 'convert', _legacy=True)
         
         
+def map_dtype(map_type):
+    """Get the data type to create a map with.
+    Valid types are Track, Speed and Click.
+    """
+    return CONFIG['Advanced']['{}DataType'.format(map_type)]
+
+
 def _get_id(id):
     """Read the ID for upgrading versions.
     If no ID exists, such as if the version may not be finished,
@@ -348,6 +361,16 @@ def upgrade_version(data={}, reset_sessions=True, update_metadata=True):
     if file_version < 28:
         for resolution in data['Resolution']:
             data['Resolution'][resolution]['Speed'] = numpy.array(resolution, create=True)
+    
+    #Store maps as smaller data types
+    if file_version < 31:
+        for resolution, maps in get_items(data['Resolution']):
+            maps['Tracks'] = numpy.fit_type(maps['Tracks'], map_dtype('Track'))
+            maps['Speed'] = numpy.fit_type(maps['Speed'], map_dtype('Speed'))
+            for session in maps['Clicks'].values():
+                for click_type in session.values():
+                    for button, array in get_items(click_type):
+                        click_type[button] = numpy.fit_type(array, map_dtype('Click'))
         
     version_update = data.get('FileVersion', '0') != FILE_VERSION
     
@@ -377,37 +400,37 @@ def upgrade_version(data={}, reset_sessions=True, update_metadata=True):
             #Empty session arrays
             for resolution, values in get_items(data['Resolution']):
                 if 'Session' not in values['Clicks']:
-                    values['Clicks']['Session'] = {'Single': {'Left': numpy.array(resolution, create=True),
-                                                              'Middle': numpy.array(resolution, create=True),
-                                                              'Right': numpy.array(resolution, create=True)},
-                                                   'Double': {'Left': numpy.array(resolution, create=True),
-                                                              'Middle': numpy.array(resolution, create=True),
-                                                              'Right': numpy.array(resolution, create=True)}}
+                    values['Clicks']['Session'] = {'Single': {'Left': numpy.array(resolution, create=True, dtype=map_dtype('Click')),
+                                                              'Middle': numpy.array(resolution, create=True, dtype=map_dtype('Click')),
+                                                              'Right': numpy.array(resolution, create=True, dtype=map_dtype('Click'))},
+                                                   'Double': {'Left': numpy.array(resolution, create=True, dtype=map_dtype('Click')),
+                                                              'Middle': numpy.array(resolution, create=True, dtype=map_dtype('Click')),
+                                                              'Right': numpy.array(resolution, create=True, dtype=map_dtype('Click'))}}
                 else:
                     try:
                         values['Clicks']['Session']['Single']['Left'] = numpy.fill(values['Clicks']['Session']['Single']['Left'], 0)
                     except AttributeError:
-                        values['Clicks']['Session']['Single']['Left'] = numpy.array(resolution, create=True)
+                        values['Clicks']['Session']['Single']['Left'] = numpy.array(resolution, create=True, dtype=map_dtype('Click'))
                     try:
                         values['Clicks']['Session']['Single']['Middle'] = numpy.fill(values['Clicks']['Session']['Single']['Middle'], 0)
                     except AttributeError:
-                        values['Clicks']['Session']['Single']['Middle'] = numpy.array(resolution, create=True)
+                        values['Clicks']['Session']['Single']['Middle'] = numpy.array(resolution, create=True, dtype=map_dtype('Click'))
                     try:
                         values['Clicks']['Session']['Single']['Right'] = numpy.fill(values['Clicks']['Session']['Single']['Right'], 0)
                     except AttributeError:
-                        values['Clicks']['Session']['Single']['Right'] = numpy.array(resolution, create=True)
+                        values['Clicks']['Session']['Single']['Right'] = numpy.array(resolution, create=True, dtype=map_dtype('Click'))
                     try:
                         values['Clicks']['Session']['Double']['Left'] = numpy.fill(values['Clicks']['Session']['Double']['Left'], 0)
                     except AttributeError:
-                        values['Clicks']['Session']['Double']['Left'] = numpy.array(resolution, create=True)
+                        values['Clicks']['Session']['Double']['Left'] = numpy.array(resolution, create=True, dtype=map_dtype('Click'))
                     try:
                         values['Clicks']['Session']['Double']['Middle'] = numpy.fill(values['Clicks']['Session']['Double']['Middle'], 0)
                     except AttributeError:
-                        values['Clicks']['Session']['Double']['Middle'] = numpy.array(resolution, create=True)
+                        values['Clicks']['Session']['Double']['Middle'] = numpy.array(resolution, create=True, dtype=map_dtype('Click'))
                     try:
                         values['Clicks']['Session']['Double']['Right'] = numpy.fill(values['Clicks']['Session']['Double']['Right'], 0)
                     except AttributeError:
-                        values['Clicks']['Session']['Double']['Right'] = numpy.array(resolution, create=True)
+                        values['Clicks']['Session']['Double']['Right'] = numpy.array(resolution, create=True, dtype=map_dtype('Click'))
             
             data['Gamepad']['Session'] = {'Buttons': {'Pressed': {}, 'Held': {}}, 'Axis': {}}
             data['TimesLoaded'] += 1
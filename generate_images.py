@@ -5,6 +5,7 @@ Source: https://github.com/Peter92/MouseTracks
 
 from __future__ import absolute_import, division
 
+import argparse
 import time
 import sys
 import webbrowser
@@ -298,6 +299,29 @@ def user_generate():
         Message(string['option']['error']['nothing'])
 
         
+def batch_generate(args):
+    """Generate images for a list of profiles without asking for input."""
+    from core.image.batch import render_batch, RENDER_TYPES
+    
+    parser = argparse.ArgumentParser(description='Generate images for multiple profiles.')
+    parser.add_argument('profiles', nargs='*', help='profiles to render (default: all)')
+    parser.add_argument('--types', default=','.join(RENDER_TYPES),
+                        help='comma separated image types (default: {})'.format(','.join(RENDER_TYPES)))
+    parser.add_argument('--session', action='store_true', help='only render the last session')
+    parser.add_argument('--processes', type=int, default=None, help='number of profiles to render at once')
+    parser.add_argument('--memory', type=int, default=None, help='memory limit in megabytes')
+    options = parser.parse_args(args)
+    
+    results = render_batch(options.profiles or None, 
+                           image_types=[image_type.strip() for image_type in options.types.split(',') if image_type.strip()],
+                           last_session=options.session,
+                           processes=options.processes,
+                           memory_limit=options.memory)
+    return not any(result['Error'] for result in results)
+
+        
 if __name__ == '__main__':
     freeze_support()
+    if len(sys.argv) > 1:
+        sys.exit(0 if batch_generate(sys.argv[1:]) else 1)
     user_generate()
@@ -0,0 +1,16 @@
+"""
+This is part of the Mouse Tracks Python application.
+Source: https://github.com/Peter92/MouseTracks
+"""
+#Run the tests from the main folder, so that the language and config files can be found
+
+from __future__ import absolute_import
+
+import sys
+import unittest
+
+
+if __name__ == '__main__':
+    tests = unittest.defaultTestLoader.discover('tests', top_level_dir='.')
+    result = unittest.TextTestRunner(verbosity=2).run(tests)
+    sys.exit(not result.wasSuccessful())
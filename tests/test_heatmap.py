@@ -0,0 +1,49 @@
+"""
+This is part of the Mouse Tracks Python application.
+Source: https://github.com/Peter92/MouseTracks
+"""
+
+from __future__ import absolute_import, division
+
+import unittest
+
+import core.numpy as numpy
+from core.image.calculate import arrays_to_heatmap, clip_value
+from core.image.scipy import FFT_MIN_SIGMA, blur
+from core.maths import round_int
+
+
+def _clicks():
+    """Sparse array of clicks, similar to a click map."""
+    array = numpy.array((200, 150), create=True, dtype='int64')
+    for i in range(50):
+        array[(i * 37) % 150, (i * 53) % 200] = i % 7 + 1
+    return array
+
+
+class TestHeatmap(unittest.TestCase):
+    
+    def _check(self, gaussian_size):
+        (min_value, max_value), heatmap = arrays_to_heatmap([_clicks()], gaussian_size=gaussian_size, clip=0.999)
+        self.assertEqual(heatmap.dtype.kind, 'f')
+        self.assertGreater(numpy.count(heatmap), 1000)
+        self.assertGreater(max_value, min_value)
+    
+    def test_small_blur(self):
+        #Small blurs don't use the FFT, which once kept the integer type and gave an empty heatmap
+        self._check(FFT_MIN_SIGMA // 2)
+    
+    def test_large_blur(self):
+        self._check(FFT_MIN_SIGMA * 2)
+    
+    def test_clip_value(self):
+        heatmap = numpy.fft_blur(_clicks().astype('float64'), 4)
+        unique = numpy.sort(heatmap.ravel(), unique=True)
+        for clip in (0, 0.5, 0.999, 1):
+            expected = unique[min(round_int(unique.size * clip), unique.size - 1)]
+            self.assertEqual(clip_value(heatmap, clip), expected)
+            self.assertLessEqual(clip_value(heatmap, clip, accuracy='low'), heatmap.max())
+    
+    def test_blur_type(self):
+        for size in (FFT_MIN_SIGMA // 2, FFT_MIN_SIGMA * 2):
+            self.assertEqual(blur(_clicks(), size).dtype, numpy.array(0.0).dtype)
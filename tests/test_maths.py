@@ -0,0 +1,87 @@
+"""
+This is part of the Mouse Tracks Python application.
+Source: https://github.com/Peter92/MouseTracks
+"""
+
+from __future__ import absolute_import, division
+
+import random
+import unittest
+from fractions import Fraction
+
+import core.numpy as numpy
+from core.maths import calculate_line, round_int
+
+
+def reference_line(start, end):
+    """Original slope stepping from calculate_line, using exact fractions.
+    The original used a float slope, which could move a pixel from rounding errors.
+    """
+    result = []
+    start = (round_int(start[0]), round_int(start[1]))
+    end = (round_int(end[0]), round_int(end[1]))
+    if start == end:
+        return result
+    
+    difference = (end[0] - start[0], end[1] - start[1])
+    if not difference[0] or not difference[1]:
+        length = max(abs(difference[0]), abs(difference[1]))
+        x_step = (difference[0] > 0) - (difference[0] < 0)
+        y_step = (difference[1] > 0) - (difference[1] < 0)
+        return [(start[0] + x_step * i, start[1] + y_step * i) for i in range(1, length)]
+    
+    slope = Fraction(difference[1], difference[0])
+    count = slope
+    x, y = start
+    x_neg = -1 if difference[0] < 0 else 1
+    y_neg = -1 if difference[1] < 0 else 1
+    while True:
+        if count >= 1:
+            y += y_neg
+            count -= 1
+        elif count <= -1:
+            y += y_neg
+            count += 1
+        else:
+            x += x_neg
+            count += slope
+        
+        coordinate = (x, y)
+        if coordinate == end:
+            return result
+        result.append(coordinate)
+        if end[0] in (x-1, x, x+1) and end[1] in (y-1, y, y+1):
+            return result
+
+
+def _segments():
+    """Every short line from the origin, and random lines across a 4K screen."""
+    segments = [((0, 0), (x, y)) for x in range(-20, 21) for y in range(-20, 21)]
+    generator = random.Random(0)
+    for i in range(300):
+        segments.append(((generator.randint(0, 3839), generator.randint(0, 2159)),
+                         (generator.randint(0, 3839), generator.randint(0, 2159))))
+    return segments
+    
+
+class TestCalculateLine(unittest.TestCase):
+    
+    def test_reference(self):
+        for start, end in _segments():
+            self.assertEqual(calculate_line(start, end), reference_line(start, end), (start, end))
+    
+    def test_float_error(self):
+        #The original float slope stepped through (-3, -1) here
+        self.assertEqual(calculate_line((0, 0), (-15, -10))[:3], [(-1, 0), (-1, -1), (-2, -1)])
+        self.assertIn((-2, -2), calculate_line((0, 0), (-15, -10)))
+    
+    def test_numpy(self):
+        for start, end in _segments():
+            x, y = numpy.calculate_line(start, end)
+            self.assertEqual(list(zip(x.tolist(), y.tolist())), calculate_line(start, end), (start, end))
+    
+    def test_numpy_batch(self):
+        segments = _segments()
+        x, y, segment = numpy.calculate_lines(segments)
+        expected = [(i, point) for i, (start, end) in enumerate(segments) for point in calculate_line(start, end)]
+        self.assertEqual(list(zip(segment.tolist(), zip(x.tolist(), y.tolist()))), expected)